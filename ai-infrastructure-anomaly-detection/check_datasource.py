@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 import requests
 import json
+from requests.adapters import HTTPAdapter
+
+# Reuse one keep-alive connection to Grafana for every call
+session = requests.Session()
+session.auth = ('admin', 'admin')
+session.headers['Content-Type'] = 'application/json'
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
 
 # Get datasource details
-response = requests.get(
-    'http://localhost:3000/api/datasources/uid/influxdb',
-    auth=('admin', 'admin')
-)
+response = session.get('http://localhost:3000/api/datasources/uid/influxdb')
 
 ds = response.json()
 print('Datasource Configuration:')
@@ -58,11 +62,9 @@ payload = {
     }
 }
 
-response = requests.post(
+response = session.post(
     'http://localhost:3000/api/ds/query',
-    json=payload,
-    auth=('admin', 'admin'),
-    headers={'Content-Type': 'application/json'}
+    json=payload
 )
 
 print(f'Query Response Status: {response.status_code}')
@@ -1,13 +1,17 @@
 #!/usr/bin/env python
 import requests
 import json
+from requests.adapters import HTTPAdapter
+
+# Reuse one keep-alive connection to Grafana for every call
+session = requests.Session()
+session.auth = ('admin', 'admin')
+session.headers['Content-Type'] = 'application/json'
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
 
 # Get current datasource
 print("Fetching datasource configuration...")
-response = requests.get(
-    'http://localhost:3000/api/datasources/uid/influxdb',
-    auth=('admin', 'admin')
-)
+response = session.get('http://localhost:3000/api/datasources/uid/influxdb')
 
 ds = response.json()
 print(f'Current enabled state: {ds.get("enabled", "unknown")}')
@@ -15,11 +19,9 @@ print(f'Current enabled state: {ds.get("enabled", "unknown")}')
 # Update datasource to enable it
 ds['enabled'] = True
 print("Enabling datasource...")
-response = requests.put(
+response = session.put(
     'http://localhost:3000/api/datasources/uid/influxdb',
-    json=ds,
-    auth=('admin', 'admin'),
-    headers={'Content-Type': 'application/json'}
+    json=ds
 )
 
 if response.status_code == 200:
@@ -28,10 +30,7 @@ if response.status_code == 200:
     print(f'Message: {result.get("message", "OK")}')
     
     # Verify it's enabled
-    response = requests.get(
-        'http://localhost:3000/api/datasources/uid/influxdb',
-        auth=('admin', 'admin')
-    )
+    response = session.get('http://localhost:3000/api/datasources/uid/influxdb')
     ds = response.json()
     print(f'New enabled state: {ds.get("enabled")}')
 else:
@@ -6,10 +6,18 @@ instead of synthetic data. This ensures the model learns from real baseline beha
 """
 
 import pandas as pd
+import numpy as np
 import os
-from influxdb import InfluxDBClient
+from influxdb import DataFrameClient
 from datetime import datetime
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # Configuration
 INFLUXDB_HOST = os.getenv("INFLUXDB_HOST", "influxdb")
 INFLUXDB_PORT = int(os.getenv("INFLUXDB_PORT", "8086"))
@@ -18,11 +26,14 @@ INFLUXDB_DATABASE = "system_metrics"
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_PATH = os.path.join(BASE_DIR, "data/raw/system_metrics.csv")
 
-# Ensure directory exists
-os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-
 # Connect to InfluxDB
-client = InfluxDBClient(host=INFLUXDB_HOST, port=INFLUXDB_PORT, database=INFLUXDB_DATABASE)
+client = DataFrameClient(
+    host=INFLUXDB_HOST,
+    port=INFLUXDB_PORT,
+    database=INFLUXDB_DATABASE,
+    timeout=30,
+    pool_size=10
+)
 
 print("Collecting real system data from InfluxDB...")
 
@@ -53,24 +64,21 @@ GROUP BY time(30s)
 fill(null)
 '''
 
-# Execute queries
-cpu_result = list(client.query(cpu_query).get_points())
-mem_result = list(client.query(mem_query).get_points())
-net_result = list(client.query(net_query).get_points())
+# Execute all three queries in a single multi-statement request (one round-trip).
+# DataFrameClient returns one {measurement: DataFrame} dict per statement, each
+# frame already sorted on a DatetimeIndex.
+cpu_rs, mem_rs, net_rs = client.query(";".join([cpu_query, mem_query, net_query]))
+cpu_df = cpu_rs.get("cpu", pd.DataFrame())
+mem_df = mem_rs.get("mem", pd.DataFrame())
+net_df = net_rs.get("net", pd.DataFrame())
 
-print(f"Retrieved {len(cpu_result)} CPU samples")
-print(f"Retrieved {len(mem_result)} memory samples")
-print(f"Retrieved {len(net_result)} network samples")
-
-# Convert to DataFrames
-cpu_df = pd.DataFrame(cpu_result)
-mem_df = pd.DataFrame(mem_result)
-net_df = pd.DataFrame(net_result)
+print(f"Retrieved {len(cpu_df)} CPU samples")
+print(f"Retrieved {len(mem_df)} memory samples")
+print(f"Retrieved {len(net_df)} network samples")
 
 # Calculate CPU usage from idle
 if not cpu_df.empty and 'cpu_idle' in cpu_df.columns:
     cpu_df['cpu_usage'] = 100 - cpu_df['cpu_idle']
-    cpu_df['time'] = pd.to_datetime(cpu_df['time'])
 else:
     print("ERROR: No CPU data found")
     exit(1)
@@ -78,33 +86,29 @@ else:
 # Rename memory column
 if not mem_df.empty and 'mem_used' in mem_df.columns:
     mem_df['memory_usage'] = mem_df['mem_used']
-    mem_df['time'] = pd.to_datetime(mem_df['time'])
 else:
     print("ERROR: No memory data found")
     exit(1)
 
 # Calculate network rate
 if not net_df.empty and 'bytes_in' in net_df.columns:
-    net_df['time'] = pd.to_datetime(net_df['time'])
-    net_df = net_df.sort_values('time')
-    
     # Calculate rate as bytes per second (difference between consecutive samples)
-    net_df['network_load'] = net_df['bytes_in'].diff() / 30.0  # 30 second intervals
-    net_df['network_load'] = net_df['network_load'].fillna(0)
-    net_df['network_load'] = net_df['network_load'].clip(lower=0)  # Remove negative values
+    # (float64 on purpose: cumulative byte counters exceed float32's exact range)
+    bytes_in = net_df['bytes_in'].to_numpy(dtype=np.float64)
+    network_load = np.ediff1d(bytes_in, to_begin=0.0)
+    network_load *= 1.0 / 30.0  # 30 second intervals
+    np.fmax(network_load, 0.0, out=network_load)  # Remove negative values (and gaps -> 0)
+    net_df['network_load'] = network_load
 else:
     print("ERROR: No network data found")
     exit(1)
 
-# Merge all three DataFrames on time
-merged_df = cpu_df[['time', 'cpu_usage']].merge(
-    mem_df[['time', 'memory_usage']], 
-    on='time', 
-    how='inner'
-).merge(
-    net_df[['time', 'network_load']], 
-    on='time', 
-    how='inner'
+# All three series share the same GROUP BY time(30s) grid, so align them on
+# the time index instead of hash-joining with chained merges
+merged_df = pd.concat(
+    [cpu_df['cpu_usage'], mem_df['memory_usage'], net_df['network_load']],
+    axis=1,
+    join='inner'
 )
 
 # Remove any rows with NaN values
@@ -116,8 +120,16 @@ merged_df['anomaly'] = 0
 # Select only the required columns
 final_df = merged_df[['cpu_usage', 'memory_usage', 'network_load', 'anomaly']]
 
-# Save to CSV
-final_df.to_csv(OUTPUT_PATH, index=False)
+# Save to CSV (streamed in 8192-row batches)
+os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+if PYARROW_AVAILABLE:
+    pacsv.write_csv(
+        pa.Table.from_pandas(final_df, preserve_index=False),
+        OUTPUT_PATH,
+        write_options=pacsv.WriteOptions(batch_size=8192)
+    )
+else:
+    final_df.to_csv(OUTPUT_PATH, index=False, chunksize=8192)
 
 print(f"\n✅ Successfully saved {len(final_df)} real system samples to {OUTPUT_PATH}")
 print(f"\nData statistics:")
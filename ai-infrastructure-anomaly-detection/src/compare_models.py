@@ -21,23 +21,29 @@ import time
 import os
 import logging
 from datetime import datetime
+from sklearn.utils.validation import check_array
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import (
-    precision_score, recall_score, f1_score,
-    roc_auc_score, confusion_matrix, classification_report
-)
+from sklearn.metrics import roc_auc_score
 
 # All models already available in scikit-learn!
 from sklearn.ensemble import IsolationForest
 from sklearn.neighbors import LocalOutlierFactor
-from sklearn.svm import OneClassSVM
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import SGDOneClassSVM
+from sklearn.pipeline import Pipeline
 from sklearn.covariance import EllipticEnvelope
 from sklearn.mixture import GaussianMixture
 
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import pyarrow  # noqa: F401 - enables pandas' multithreaded Arrow CSV reader
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -49,12 +55,27 @@ logger = logging.getLogger(__name__)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 HISTORICAL_DATA_PATH = os.path.join(BASE_DIR, "data/processed/system_metrics_processed.csv")
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
-os.makedirs(RESULTS_DIR, exist_ok=True)
 
 # Model configurations
 CONTAMINATION = 0.05  # 5% of data assumed to be anomalies
 RANDOM_STATE = 42
 TEST_SIZE = 0.2
+REPORT_BANNER = "=" * 80
+N_JOBS = int(os.getenv("N_JOBS", "-1"))  # Cores for the model fan-out (-1 = all); fits inside it run single-threaded
+
+def _gmm_anomaly_flags(train_scores, test_scores, quantile):
+    """Flag test samples whose log-likelihood is below the training quantile (1 = anomaly)."""
+    k = min(int(quantile * train_scores.size), train_scores.size - 1)
+    threshold = np.partition(train_scores, k)[k]
+    return (test_scores < threshold).astype(np.int64)
+
+
+def _binary_confusion(y_true, y_pred):
+    """Return (tn, fp, fn, tp) for 0/1 label arrays using a single bincount."""
+    codes = (np.asarray(y_true, dtype=np.intp) << 1) | np.asarray(y_pred, dtype=np.intp)
+    tn, fp, fn, tp = np.bincount(codes, minlength=4)
+    return int(tn), int(fp), int(fn), int(tp)
+
 
 class ModelComparison:
     """Trains and compares multiple anomaly detection models."""
@@ -63,7 +84,11 @@ class ModelComparison:
         self.data_path = data_path
         self.contamination = contamination
         self.results = {}
-        self.scaler = StandardScaler()
+        # Scale in place and skip centering: the metrics are non-negative and every
+        # compared model is translation-invariant, so only the variance scaling matters
+        self.scaler = StandardScaler(copy=False, with_mean=False)
+        self._reference_iforest = None
+        self._reference_fit_time = 0.0
         
     def load_data(self):
         """Load and prepare data."""
@@ -71,15 +96,18 @@ class ModelComparison:
         if not os.path.exists(self.data_path):
             raise FileNotFoundError(f"Data not found: {self.data_path}")
         
-        df = pd.read_csv(self.data_path)
         features = ["cpu_usage", "memory_usage", "network_load"]
         
-        # Check if features exist
+        # Check if features exist (header only)
+        columns = pd.read_csv(self.data_path, nrows=0).columns
         for feat in features:
-            if feat not in df.columns:
+            if feat not in columns:
                 raise ValueError(f"Missing feature: {feat}")
         
-        X = df[features].values
+        # Only parse the feature columns
+        df = pd.read_csv(self.data_path, engine=CSV_ENGINE, usecols=features)
+        
+        X = df[features].to_numpy()
         logger.info("Loaded %d samples with %d features", X.shape[0], X.shape[1])
         
         return X
@@ -94,23 +122,31 @@ class ModelComparison:
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
+        # float32 halves the memory traffic through the estimators
+        X_train_scaled = X_train_scaled.astype(np.float32, copy=False)
+        X_test_scaled = X_test_scaled.astype(np.float32, copy=False)
+        
         logger.info("Train size: %d, Test size: %d", len(X_train), len(X_test))
         
-        # Create pseudo labels (assuming Isolation Forest as reference)
-        iso_forest = IsolationForest(contamination=self.contamination, random_state=RANDOM_STATE)
-        y_test = iso_forest.fit_predict(X_train_scaled)
+        # Create pseudo labels for the test set (assuming Isolation Forest as reference).
+        # The fitted reference is kept and reused as the "Isolation Forest" candidate.
+        fit_start = time.time()
+        self._reference_iforest = self.create_models()["Isolation Forest"]["model"].fit(X_train_scaled)
+        self._reference_fit_time = time.time() - fit_start
+        y_test = self._reference_iforest.predict(X_test_scaled)
         y_test = (y_test == -1).astype(int)  # -1 = anomaly, 1 = normal
         
         return X_train_scaled, X_test_scaled, y_test
     
-    def create_models(self):
-        """Create all model instances."""
+    def create_models(self, n_jobs=N_JOBS):
+        """Create all model instances (n_jobs: cores used inside each estimator)."""
         models = {
             "Isolation Forest": {
                 "model": IsolationForest(
                     contamination=self.contamination,
                     random_state=RANDOM_STATE,
-                    n_estimators=100
+                    n_estimators=100,
+                    n_jobs=n_jobs
                 ),
                 "requires_fit": True,
                 "negative_label": -1
@@ -119,17 +155,27 @@ class ModelComparison:
                 "model": LocalOutlierFactor(
                     n_neighbors=20,
                     contamination=self.contamination,
-                    novelty=False  # Use original data for evaluation
+                    novelty=False,  # Use original data for evaluation
+                    n_jobs=n_jobs
                 ),
                 "requires_fit": True,
                 "negative_label": -1
             },
             "One-Class SVM": {
-                "model": OneClassSVM(
-                    nu=self.contamination,
-                    kernel='rbf',
-                    gamma='auto'
-                ),
+                # RBF kernel approximated with Nystroem features + linear one-class SVM:
+                # near-linear training and a single dot product per prediction
+                "model": Pipeline([
+                    ("nystroem", Nystroem(
+                        kernel='rbf',
+                        gamma=None,  # 1 / n_features, same as gamma='auto'
+                        n_components=100,
+                        random_state=RANDOM_STATE
+                    )),
+                    ("svm", SGDOneClassSVM(
+                        nu=self.contamination,
+                        random_state=RANDOM_STATE
+                    ))
+                ]),
                 "requires_fit": True,
                 "negative_label": -1
             },
@@ -153,170 +199,194 @@ class ModelComparison:
         }
         return models
     
-    def train_and_evaluate(self, X_train, X_test, y_test):
-        """Train all models and evaluate on test set."""
-        models = self.create_models()
-        
-        for model_name, model_dict in models.items():
-            logger.info("=" * 60)
-            logger.info("Training: %s", model_name)
-            logger.info("=" * 60)
+    def _evaluate_model(self, model_name, model_dict, X_train, X_test, y_test):
+        """Fit a single model and compute its metrics (runs in a worker process)."""
+        try:
+            model = model_dict["model"]
             
-            try:
-                model = model_dict["model"]
-                
-                # Training time
-                train_start = time.time()
-                
-                if model_name == "Gaussian Mixture Model":
-                    # Special handling for GMM
-                    model.fit(X_train)
-                    # Predict using log probability
-                    y_scores_test = model.score_samples(X_test)
-                    # Lower probability = anomaly
-                    threshold = np.percentile(model.score_samples(X_train), 100 * self.contamination)
-                    y_pred = (y_scores_test < threshold).astype(int)
-                else:
-                    # Standard fit/predict
+            # Training time
+            train_start = time.time()
+            
+            if model_name == "Gaussian Mixture Model":
+                # Special handling for GMM
+                model.fit(X_train)  # n_init restarts run serially inside this worker
+                # Predict using log probability
+                y_scores_test = model.score_samples(X_test)
+                # Lower probability = anomaly (threshold from training log-likelihoods)
+                train_scores = model.score_samples(X_train)
+                y_pred_binary = _gmm_anomaly_flags(train_scores, y_scores_test, self.contamination)
+            else:
+                # Standard fit, then score the test set once: predict() is just
+                # decision_function < 0 (-1 = anomaly), so derive labels from the scores
+                if model_dict["requires_fit"]:
                     model.fit(X_train)
-                    y_pred = model.predict(X_test)
-                    y_scores_test = model.score_samples(X_test) if hasattr(model, 'score_samples') else model.decision_function(X_test)
-                
-                train_time = time.time() - train_start
-                
-                # Convert predictions (-1 = anomaly, 1 = normal)
-                y_pred_binary = (y_pred == -1).astype(int)
-                
-                # Inference time (measure over 100 predictions)
-                inference_times = []
-                for _ in range(100):
-                    start = time.time()
-                    if model_name == "Gaussian Mixture Model":
-                        _ = model.score_samples(X_test[:1])
-                    else:
-                        _ = model.predict(X_test[:1])
-                    inference_times.append(time.time() - start)
-                
-                avg_latency = np.mean(inference_times) * 1000  # Convert to ms
-                
-                # Calculate metrics
-                try:
-                    roc_auc = roc_auc_score(y_test, y_scores_test)
-                except:
-                    roc_auc = 0.0  # If all predictions same class
-                
-                precision = precision_score(y_test, y_pred_binary, zero_division=0)
-                recall = recall_score(y_test, y_pred_binary, zero_division=0)
-                f1 = f1_score(y_test, y_pred_binary, zero_division=0)
-                
-                tn, fp, fn, tp = confusion_matrix(y_test, y_pred_binary).ravel()
-                specificity = tn / (tn + fp) if (tn + fp) > 0 else 0
-                
-                # Store results
-                self.results[model_name] = {
-                    "training_time_sec": round(train_time, 4),
-                    "avg_latency_ms": round(avg_latency, 4),
-                    "precision": round(precision, 4),
-                    "recall": round(recall, 4),
-                    "f1_score": round(f1, 4),
-                    "roc_auc": round(roc_auc, 4),
-                    "specificity": round(specificity, 4),
-                    "true_positives": int(tp),
-                    "false_positives": int(fp),
-                    "true_negatives": int(tn),
-                    "false_negatives": int(fn),
-                    "status": "✅ Success"
-                }
-                
+                y_scores_test = model.decision_function(X_test)
+                y_pred_binary = (y_scores_test < 0).astype(int)
+            
+            train_time = time.time() - train_start + model_dict.get("fit_time_sec", 0.0)
+            
+            # Inference time (measure over 100 single-sample predictions).
+            # Validate/copy the row once so the loop only times the model itself.
+            X_test_single = check_array(X_test[:1], dtype=X_test.dtype, order="C")
+            infer = model.score_samples if model_name == "Gaussian Mixture Model" else model.predict
+            latency_start = time.perf_counter()
+            for _ in range(100):
+                infer(X_test_single)
+            avg_latency = (time.perf_counter() - latency_start) / 100 * 1000  # Convert to ms
+            
+            # Calculate metrics
+            try:
+                # Both score kinds rise with normality while y_test marks
+                # anomalies as 1, so rank by the negated score
+                roc_auc = roc_auc_score(y_test, -y_scores_test)
+            except:
+                roc_auc = 0.0  # If all predictions same class
+            
+            # Confusion counts in one pass; metrics follow sklearn's zero_division=0
+            tn, fp, fn, tp = _binary_confusion(y_test, y_pred_binary)
+            precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
+            recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
+            f1 = 2 * tp / (2 * tp + fp + fn) if tp > 0 else 0.0
+            specificity = tn / (tn + fp) if (tn + fp) > 0 else 0
+            
+            return {
+                "training_time_sec": round(train_time, 4),
+                "avg_latency_ms": round(avg_latency, 4),
+                "precision": round(precision, 4),
+                "recall": round(recall, 4),
+                "f1_score": round(f1, 4),
+                "roc_auc": round(roc_auc, 4),
+                "specificity": round(specificity, 4),
+                "true_positives": int(tp),
+                "false_positives": int(fp),
+                "true_negatives": int(tn),
+                "false_negatives": int(fn),
+                "status": "✅ Success"
+            }
+            
+        except Exception as e:
+            return {
+                "status": f"❌ Error: {str(e)}"
+            }
+    
+    def train_and_evaluate(self, X_train, X_test, y_test):
+        """Train all models in parallel and evaluate on test set."""
+        # Each model already gets its own worker process, so estimators inside
+        # the pool stay single-threaded instead of each claiming every core
+        models = self.create_models(n_jobs=1)
+        
+        # Reuse the reference Isolation Forest fitted in prepare_splits
+        if self._reference_iforest is not None:
+            models["Isolation Forest"].update({
+                "model": self._reference_iforest.set_params(n_jobs=1),
+                "requires_fit": False,
+                "fit_time_sec": self._reference_fit_time
+            })
+        
+        logger.info("=" * 60)
+        logger.info("Training %d models in parallel: %s", len(models), ", ".join(models))
+        logger.info("=" * 60)
+        
+        # Models are independent, so fit them in separate worker processes.
+        # joblib memory-maps the shared read-only arrays instead of copying them per worker.
+        n_workers = min(len(models), joblib.effective_n_jobs(N_JOBS))
+        results = joblib.Parallel(n_jobs=n_workers, backend="loky")(
+            joblib.delayed(self._evaluate_model)(model_name, model_dict, X_train, X_test, y_test)
+            for model_name, model_dict in models.items()
+        )
+        
+        for model_name, model_results in zip(models, results):
+            self.results[model_name] = model_results
+            if "f1_score" in model_results:
                 logger.info("✅ %s - F1: %.4f | Latency: %.2fms | ROC-AUC: %.4f",
-                           model_name, f1, avg_latency, roc_auc)
-                
-            except Exception as e:
-                logger.error("❌ %s - Error: %s", model_name, str(e))
-                self.results[model_name] = {
-                    "status": f"❌ Error: {str(e)}"
-                }
+                           model_name, model_results["f1_score"],
+                           model_results["avg_latency_ms"], model_results["roc_auc"])
+            else:
+                logger.error("%s - %s", model_name, model_results["status"])
     
     def generate_report(self):
         """Generate comparison report."""
-        logger.info("\n" + "=" * 80)
+        logger.info("\n%s", REPORT_BANNER)
         logger.info("MODEL COMPARISON REPORT")
-        logger.info("=" * 80)
+        logger.info(REPORT_BANNER)
         
-        # Create summary table
+        # Build the summary table and track the best models in a single pass
         summary_data = []
+        best_f1 = best_auc = best_speed = best_balanced = None
+        
         for model_name, metrics in self.results.items():
-            if "status" in metrics and "Error" not in metrics.get("status", ""):
-                summary_data.append({
-                    "Model": model_name,
-                    "F1-Score": metrics.get("f1_score", "N/A"),
-                    "Precision": metrics.get("precision", "N/A"),
-                    "Recall": metrics.get("recall", "N/A"),
-                    "ROC-AUC": metrics.get("roc_auc", "N/A"),
-                    "Latency (ms)": metrics.get("avg_latency_ms", "N/A"),
-                    "Training (s)": metrics.get("training_time_sec", "N/A")
-                })
+            if "f1_score" not in metrics:
+                continue
+            
+            summary_data.append({
+                "Model": model_name,
+                "F1-Score": metrics["f1_score"],
+                "Precision": metrics["precision"],
+                "Recall": metrics["recall"],
+                "ROC-AUC": metrics["roc_auc"],
+                "Latency (ms)": metrics["avg_latency_ms"],
+                "Training (s)": metrics["training_time_sec"]
+            })
+            
+            # Best balanced (F1 + Speed)
+            balanced = metrics["f1_score"] * 0.7 + (100 - min(metrics["avg_latency_ms"], 100)) / 100 * 0.3
+            
+            if best_f1 is None or metrics["f1_score"] > best_f1[1]:
+                best_f1 = (model_name, metrics["f1_score"])
+            if best_auc is None or metrics["roc_auc"] > best_auc[1]:
+                best_auc = (model_name, metrics["roc_auc"])
+            if best_speed is None or metrics["avg_latency_ms"] < best_speed[1]:
+                best_speed = (model_name, metrics["avg_latency_ms"])
+            if best_balanced is None or balanced > best_balanced[1]:
+                best_balanced = (model_name, balanced)
         
         summary_df = pd.DataFrame(summary_data)
         logger.info("\n%s", summary_df.to_string(index=False))
         
         # Find best models
-        logger.info("\n" + "=" * 80)
+        logger.info("\n%s", REPORT_BANNER)
         logger.info("TOP MODELS")
-        logger.info("=" * 80)
-        
-        valid_results = {k: v for k, v in self.results.items() if "f1_score" in v}
+        logger.info(REPORT_BANNER)
         
-        if valid_results:
-            # Best F1-Score
-            best_f1_model = max(valid_results.items(), key=lambda x: x[1]["f1_score"])
-            logger.info("🏆 Best F1-Score: %s (%.4f)", best_f1_model[0], best_f1_model[1]["f1_score"])
-            
-            # Best ROC-AUC
-            best_auc_model = max(valid_results.items(), key=lambda x: x[1]["roc_auc"])
-            logger.info("🎯 Best ROC-AUC: %s (%.4f)", best_auc_model[0], best_auc_model[1]["roc_auc"])
-            
-            # Fastest
-            best_speed_model = min(valid_results.items(), key=lambda x: x[1]["avg_latency_ms"])
-            logger.info("⚡ Fastest: %s (%.2fms)", best_speed_model[0], best_speed_model[1]["avg_latency_ms"])
-            
-            # Best balanced (F1 + Speed)
-            balanced_scores = {
-                k: (v["f1_score"] * 0.7 + (100 - min(v["avg_latency_ms"], 100)) / 100 * 0.3)
-                for k, v in valid_results.items()
-            }
-            best_balanced = max(balanced_scores.items(), key=lambda x: x[1])
-            logger.info("⚖️  Best Balanced (70% F1 + 30% Speed): %s (%.4f)", best_balanced[0], best_balanced[1])
+        if summary_data:
+            logger.info("🏆 Best F1-Score: %s (%.4f)", *best_f1)
+            logger.info("🎯 Best ROC-AUC: %s (%.4f)", *best_auc)
+            logger.info("⚡ Fastest: %s (%.2fms)", *best_speed)
+            logger.info("⚖️  Best Balanced (70%% F1 + 30%% Speed): %s (%.4f)", *best_balanced)
         
-        logger.info("\n" + "=" * 80)
+        logger.info("\n%s", REPORT_BANNER)
     
     def save_results(self):
         """Save results to JSON."""
+        # Serialize once and reuse for both the JSON file and the markdown report
+        results_json = json.dumps(self.results, indent=2)
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        
         output_path = os.path.join(RESULTS_DIR, "model_comparison_report.json")
         with open(output_path, "w") as f:
-            json.dump(self.results, f, indent=2)
+            f.write(results_json)
         logger.info("Results saved to: %s", output_path)
         
         # Also save as markdown
+        lines = [
+            "# Anomaly Detection Model Comparison Report\n\n",
+            f"Generated: {datetime.now().isoformat()}\n\n",
+            "## Summary\n\n",
+            "| Model | F1-Score | Precision | Recall | ROC-AUC | Latency (ms) | Training (s) | Status |\n",
+            "|-------|----------|-----------|--------|---------|--------------|--------------|--------|\n",
+        ]
+        
+        for model_name, metrics in self.results.items():
+            if "f1_score" in metrics:
+                lines.append(f"| {model_name} | {metrics['f1_score']} | {metrics['precision']} | {metrics['recall']} | {metrics['roc_auc']} | {metrics['avg_latency_ms']} | {metrics['training_time_sec']} | {metrics.get('status', '✅')} |\n")
+            else:
+                lines.append(f"| {model_name} | — | — | — | — | — | — | {metrics.get('status', 'Unknown')} |\n")
+        
+        lines += ["\n## Detailed Results\n\n", "```json\n", results_json, "\n```\n"]
+        
         md_path = os.path.join(RESULTS_DIR, "model_comparison_report.md")
         with open(md_path, "w") as f:
-            f.write("# Anomaly Detection Model Comparison Report\n\n")
-            f.write(f"Generated: {datetime.now().isoformat()}\n\n")
-            
-            f.write("## Summary\n\n")
-            f.write("| Model | F1-Score | Precision | Recall | ROC-AUC | Latency (ms) | Training (s) | Status |\n")
-            f.write("|-------|----------|-----------|--------|---------|--------------|--------------|--------|\n")
-            
-            for model_name, metrics in self.results.items():
-                if "f1_score" in metrics:
-                    f.write(f"| {model_name} | {metrics['f1_score']} | {metrics['precision']} | {metrics['recall']} | {metrics['roc_auc']} | {metrics['avg_latency_ms']} | {metrics['training_time_sec']} | {metrics.get('status', '✅')} |\n")
-                else:
-                    f.write(f"| {model_name} | — | — | — | — | — | — | {metrics.get('status', 'Unknown')} |\n")
-            
-            f.write("\n## Detailed Results\n\n")
-            f.write("```json\n")
-            f.write(json.dumps(self.results, indent=2))
-            f.write("\n```\n")
+            f.writelines(lines)
         
         logger.info("Markdown report saved to: %s", md_path)
 
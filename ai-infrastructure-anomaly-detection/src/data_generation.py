@@ -14,31 +14,34 @@ os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 # -------------------------------
 # Generate normal system behavior
 # -------------------------------
-np.random.seed(42)
+# One row per feature: cpu_usage, memory_usage, network_load
+FEATURES = ["cpu_usage", "memory_usage", "network_load"]
+NORMAL_LOC = np.array([[50.0], [60.0], [70.0]])
+NORMAL_SCALE = np.array([[10.0], [15.0], [5.0]])
 
-cpu_usage = np.random.normal(loc=50, scale=10, size=NUM_SAMPLES)
-memory_usage = np.random.normal(loc=60, scale=15, size=NUM_SAMPLES)
-network_load = np.random.normal(loc=70, scale=5, size=NUM_SAMPLES)
+rng = np.random.default_rng(42)
+
+metrics = np.empty((3, NUM_SAMPLES), dtype=np.float64)
+rng.standard_normal(out=metrics)
+metrics *= NORMAL_SCALE
+metrics += NORMAL_LOC
 
 # -------------------------------
 # Inject anomalies
 # -------------------------------
-anomaly_indices = np.random.choice(NUM_SAMPLES, size=50, replace=False)
+NUM_ANOMALIES = 50
+ANOMALY_LOC = np.array([[40.0], [30.0], [20.0]])
+ANOMALY_SCALE = np.array([[10.0], [10.0], [5.0]])
+
+anomaly_indices = rng.choice(NUM_SAMPLES, size=NUM_ANOMALIES, replace=False)
 
-cpu_usage[anomaly_indices] = cpu_usage[anomaly_indices] + np.random.normal(40, 10, 50)
-memory_usage[anomaly_indices] = memory_usage[anomaly_indices] + np.random.normal(30, 10, 50)
-network_load[anomaly_indices] = network_load[anomaly_indices] + np.random.normal(20, 5, 50)
+metrics[:, anomaly_indices] += rng.standard_normal((3, NUM_ANOMALIES)) * ANOMALY_SCALE + ANOMALY_LOC
 
 # -------------------------------
 # Create DataFrame
 # -------------------------------
-data = pd.DataFrame({
-    "cpu_usage": cpu_usage,
-    "memory_usage": memory_usage,
-    "network_load": network_load,
-    "anomaly": 0
-})
-
+data = pd.DataFrame(metrics.T, columns=FEATURES)
+data["anomaly"] = 0
 data.loc[anomaly_indices, "anomaly"] = 1
 
 # -------------------------------
@@ -1,13 +1,15 @@
 import pandas as pd
 import joblib
+from joblib import parallel_backend
 import time
 from influxdb import InfluxDBClient
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import f1_score, precision_score, recall_score, accuracy_score
 import numpy as np
 import os
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 try:
@@ -23,6 +25,11 @@ MODEL_PATH = os.path.join(BASE_DIR, "models/anomaly_model.pkl")
 SCALER_PATH = os.path.join(BASE_DIR, "models/scaler.pkl")
 HISTORICAL_DATA_PATH = os.path.join(BASE_DIR, "data/processed/system_metrics_processed.csv")
 
+# Long-term memory: fixed-size ring buffer of normal samples on disk
+CORE_MEMORY_PATH = os.path.join(BASE_DIR, "data/processed/core_memory.dat")
+CORE_MEMORY_INDEX_PATH = os.path.join(BASE_DIR, "data/processed/core_memory.idx")
+CORE_MEMORY_SIZE = 2000
+
 # Ensure directories exist
 os.makedirs(os.path.join(BASE_DIR, "models"), exist_ok=True)
 os.makedirs(os.path.join(BASE_DIR, "data/processed"), exist_ok=True)
@@ -34,6 +41,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 try:
     import shap
     SHAP_AVAILABLE = True
@@ -43,6 +56,9 @@ except ImportError:
 
 MLFLOW_EXPERIMENT_NAME = "anomaly_detection_retraining"
 
+# Single background worker so MLflow HTTP calls never block a monitoring tick
+mlflow_executor = ThreadPoolExecutor(max_workers=1)
+
 # InfluxDB connection
 try:
     client = InfluxDBClient(host='influxdb', port=8086, database='system_metrics')
@@ -56,33 +72,106 @@ previous_network = {"bytes": None, "time": None}
 # 🔧 NEW: Track consecutive anomalies for temporal filtering (2 min = 12 predictions)
 anomaly_counter = 0
 ANOMALY_THRESHOLD = 12  # 12 * 10sec = 2 minutes (for demo/testing)
+POLL_INTERVAL_SEC = 10  # Tick period; work done in a tick counts against it
 
 # 🔧 NEW: Surge thresholds (absolute %). Alert only if sustained + >= threshold
 CPU_SURGE_THRESHOLD = 10.0
 MEM_SURGE_THRESHOLD = 30.0
 NET_SURGE_THRESHOLD = 15000.0
 
+# Predictions are buffered and written to InfluxDB in one line-protocol batch every 6 ticks (60s)
+PREDICTION_FLUSH_TICKS = 6
+pending_points = []
+
 # 🔧 NEW: Anomaly collection for model evaluation
 DETECTED_ANOMALIES_PATH = os.path.join(BASE_DIR, "results/detected_anomalies_for_testing.csv")
 os.makedirs(os.path.join(BASE_DIR, "results"), exist_ok=True)
+DETECTED_ANOMALIES_HEADER = "cpu_usage,memory_usage,network_load,timestamp\n"
+DETECTED_ANOMALIES_MAX_ROWS = 1000  # Keep last 1000
+DETECTED_ANOMALIES_SLACK_ROWS = 100  # Compact once this many rows past the cap
+
+# Kept-open append handle and row count for the anomaly file (this process is its only writer)
+anomaly_file = None
+anomaly_file_rows = 0
+
+def compact_detected_anomalies():
+    """Trim the anomaly file down to its newest DETECTED_ANOMALIES_MAX_ROWS rows."""
+    with open(DETECTED_ANOMALIES_PATH, "r") as f:
+        f.readline()  # header
+        rows = deque(f, maxlen=DETECTED_ANOMALIES_MAX_ROWS)
+    tmp_path = DETECTED_ANOMALIES_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(DETECTED_ANOMALIES_HEADER)
+        f.writelines(rows)
+    os.replace(tmp_path, DETECTED_ANOMALIES_PATH)
+
+def open_detected_anomalies():
+    """Open the anomaly file for appending and count the rows it already holds."""
+    global anomaly_file, anomaly_file_rows
+    anomaly_file = open(DETECTED_ANOMALIES_PATH, "a+", buffering=1)
+    if anomaly_file.tell() == 0:
+        anomaly_file.write(DETECTED_ANOMALIES_HEADER)
+        anomaly_file_rows = 0
+    else:
+        anomaly_file.seek(0)
+        anomaly_file_rows = sum(1 for _ in anomaly_file) - 1  # minus header
 
 def save_detected_anomaly(cpu_val, mem_val, net_val):
-    """Save detected anomaly to file for later evaluation."""
+    """Save detected anomaly to file for later evaluation (append-only)."""
+    global anomaly_file, anomaly_file_rows
     try:
-        anomaly_record = pd.DataFrame([{
-            "cpu_usage": float(cpu_val),
-            "memory_usage": float(mem_val),
-            "network_load": float(net_val),
-            "timestamp": datetime.utcnow().isoformat()
-        }])
-        
-        if os.path.exists(DETECTED_ANOMALIES_PATH):
-            existing = pd.read_csv(DETECTED_ANOMALIES_PATH)
-            anomaly_record = pd.concat([existing, anomaly_record], ignore_index=True).tail(1000)  # Keep last 1000
+        if anomaly_file is None:
+            open_detected_anomalies()
+        anomaly_file.write(f"{float(cpu_val)},{float(mem_val)},{float(net_val)},{datetime.utcnow().isoformat()}\n")
+        anomaly_file_rows += 1
         
-        anomaly_record.to_csv(DETECTED_ANOMALIES_PATH, index=False)
+        if anomaly_file_rows > DETECTED_ANOMALIES_MAX_ROWS + DETECTED_ANOMALIES_SLACK_ROWS:
+            anomaly_file.close()
+            try:
+                compact_detected_anomalies()
+                anomaly_file_rows = DETECTED_ANOMALIES_MAX_ROWS
+            finally:
+                anomaly_file = open(DETECTED_ANOMALIES_PATH, "a", buffering=1)
     except Exception as e:
         logger.warning("Failed to save anomaly: %s", e)
+        # Drop the handle; the next save reopens the file and recounts its rows
+        if anomaly_file is not None:
+            anomaly_file.close()
+        anomaly_file = None
+
+def flush_predictions():
+    """Write buffered prediction points to InfluxDB in one batch."""
+    if pending_points:
+        client.write_points(pending_points, protocol='line', batch_size=1000)
+        pending_points.clear()
+
+def dump_artifact(obj, path):
+    """Persist a model artifact atomically (uncompressed pickle protocol 5, so it can be memory-mapped).
+
+    Writing to a temp file and renaming keeps any existing memory map of the
+    previous version valid instead of truncating the file underneath it.
+    """
+    tmp_path = path + ".tmp"
+    joblib.dump(obj, tmp_path, compress=0, protocol=5)
+    os.replace(tmp_path, path)
+
+def surge_gate(cpu_val, mem_val, net_val, model_prediction, counter,
+               cpu_threshold, mem_threshold, net_threshold, anomaly_threshold):
+    """Temporal buffering + surge gating for one tick. Returns (ai_status, counter)."""
+    surge_condition = (
+        (cpu_val >= cpu_threshold) or
+        (mem_val >= mem_threshold) or
+        (net_val >= net_threshold)
+    )
+    if model_prediction == 1 and surge_condition:
+        counter += 1
+        # Only report anomaly if we have enough consecutive detections
+        return (1 if counter >= anomaly_threshold else 0), counter
+    # Reset counter when normal or below surge threshold
+    return 0, 0
+
+if NUMBA_AVAILABLE:
+    surge_gate = njit(cache=True)(surge_gate)
 
 def log_retrain_to_mlflow(model, sample_count, metrics=None):
     """Log retraining event to MLflow."""
@@ -120,17 +209,53 @@ def log_retrain_to_mlflow(model, sample_count, metrics=None):
     except Exception as e:
         logger.warning("MLflow logging failed: %s", e)
 
-def load_core_memory():
-    """Reads the 'Long-term Memory' from the Hard Drive."""
-    if not os.path.exists(HISTORICAL_DATA_PATH):
-        return pd.DataFrame(columns=["cpu_usage", "memory_usage", "network_load"])
-    return pd.read_csv(HISTORICAL_DATA_PATH)
+def open_core_memory():
+    """Opens the 'Long-term Memory' ring buffer on the Hard Drive.
+
+    Returns (memory, index): a (CORE_MEMORY_SIZE, 3) float32 memmap of samples and
+    a 2-slot int64 memmap holding [head, count]. On first run the buffer is seeded
+    with the newest rows of the processed training CSV.
+    """
+    if os.path.exists(CORE_MEMORY_PATH) and os.path.exists(CORE_MEMORY_INDEX_PATH):
+        memory = np.memmap(CORE_MEMORY_PATH, dtype=np.float32, mode='r+', shape=(CORE_MEMORY_SIZE, 3))
+        index = np.memmap(CORE_MEMORY_INDEX_PATH, dtype=np.int64, mode='r+', shape=(2,))
+        return memory, index
+
+    memory = np.memmap(CORE_MEMORY_PATH, dtype=np.float32, mode='w+', shape=(CORE_MEMORY_SIZE, 3))
+    index = np.memmap(CORE_MEMORY_INDEX_PATH, dtype=np.int64, mode='w+', shape=(2,))
+    if os.path.exists(HISTORICAL_DATA_PATH):
+        seed = pd.read_csv(
+            HISTORICAL_DATA_PATH,
+            usecols=["cpu_usage", "memory_usage", "network_load"]
+        )[["cpu_usage", "memory_usage", "network_load"]].tail(CORE_MEMORY_SIZE).to_numpy(dtype=np.float32)
+        memory[:len(seed)] = seed
+        index[0] = len(seed) % CORE_MEMORY_SIZE
+        index[1] = len(seed)
+    memory.flush()
+    index.flush()
+    return memory, index
+
+def load_core_memory(memory, index):
+    """Reads the 'Long-term Memory' (zero-copy view of the filled rows)."""
+    return memory[:index[1]]
+
+def append_core_memory(memory, index, cpu_val, mem_val, net_val):
+    """Writes one normal sample into the ring buffer, overwriting the oldest when full."""
+    head = int(index[0])
+    memory[head] = (cpu_val, mem_val, net_val)
+    index[0] = (head + 1) % CORE_MEMORY_SIZE
+    index[1] = min(int(index[1]) + 1, CORE_MEMORY_SIZE)
+    memory.flush()
+    index.flush()
 
 def fetch_live_logs():
-    """Queries InfluxDB for the most recent system heartbeat."""
+    """Queries InfluxDB for the most recent system heartbeat.
+
+    Returns a (1, 3) float64 array [cpu, memory, network], or None if any metric is missing.
+    """
     global previous_network
     
-    # Query each measurement SEPARATELY (like Grafana does)
+    # One statement per measurement (like Grafana does), sent together in one request
     cpu_query = '''
     SELECT "usage_idle"
     FROM "cpu"
@@ -153,10 +278,15 @@ def fetch_live_logs():
     '''
     
     try:
-        # Execute each query separately
-        cpu_result = list(client.query(cpu_query).get_points())
-        mem_result = list(client.query(mem_query).get_points())
-        net_result = list(client.query(net_query).get_points())
+        # Execute all three statements in a single round-trip; the client
+        # returns one ResultSet per statement, in order (timestamps as epoch nanoseconds)
+        cpu_rs, mem_rs, net_rs = client.query(
+            ";".join([cpu_query, mem_query, net_query]),
+            epoch='ns'
+        )
+        cpu_result = list(cpu_rs.get_points())
+        mem_result = list(mem_rs.get_points())
+        net_result = list(net_rs.get_points())
         
         # Extract and calculate values
         cpu_val = None
@@ -178,8 +308,7 @@ def fetch_live_logs():
             
             if previous_network["bytes"] is not None and previous_network["time"] is not None:
                 # Calculate time difference in seconds
-                time_diff = (datetime.fromisoformat(current_time.replace('Z', '+00:00')) - 
-                           datetime.fromisoformat(previous_network["time"].replace('Z', '+00:00'))).total_seconds()
+                time_diff = (current_time - previous_network["time"]) / 1e9
                 
                 if time_diff > 0:
                     bytes_diff = current_bytes - previous_network["bytes"]
@@ -192,28 +321,31 @@ def fetch_live_logs():
         
         # Only return data if ALL three metrics are available
         if cpu_val is not None and mem_val is not None and net_val is not None:
-            data = {
-                "cpu_usage": cpu_val,
-                "memory_usage": mem_val,
-                "network_load": net_val
-            }
-            return pd.DataFrame([data])
+            return np.array([[cpu_val, mem_val, net_val]], dtype=np.float64)
         else:
-            return pd.DataFrame()
+            return None
             
     except Exception as e:
         logger.warning("Database error: %s", e)
-        return pd.DataFrame()
+        return None
 
 # --- 2. THE MAIN SYNC PIPELINE ---
 def run_pipeline():
     logger.info("Initializing non-stop monitoring...")
     features = ["cpu_usage", "memory_usage", "network_load"]
     
+    # Reused input row for single-sample inference (scaled in place each tick).
+    # float32 throughout: the trees store split thresholds as float32 anyway
+    latest_scaled = np.empty((1, len(features)), dtype=np.float32)
+    scaler_mean = None
+    scaler_scale = None
+    
     # STEP 1: PRE-LOAD BRAIN (The "Detector")
     try:
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
+        # Memory-map the stored arrays instead of copying them onto the heap
+        model = joblib.load(MODEL_PATH, mmap_mode='r')
+        scaler = joblib.load(SCALER_PATH, mmap_mode='r')
+        scaler_mean, scaler_scale = scaler.mean_, scaler.scale_
         logger.info("Pre-trained model found. Starting detection immediately.")
         ai_is_ready = True
 
@@ -231,162 +363,185 @@ def run_pipeline():
         shap_explainer = None
 
     last_retrain_time = time.time()
+    core_memory, core_memory_index = open_core_memory()
+    # This process is the only writer, so the view stays valid between ticks
+    updated_memory = load_core_memory(core_memory, core_memory_index)
 
-    while True:
-        historical_df = load_core_memory()
-        live_df = fetch_live_logs()
-
-        if not live_df.empty:
-            current_metrics = live_df[features]
-
-            cpu_val = float(current_metrics["cpu_usage"].values[0])
-            mem_val = float(current_metrics["memory_usage"].values[0])
-            net_val = float(current_metrics["network_load"].values[0])
-
-            # STEP 3: IMMEDIATE DETECTION (Raw model output)
-            model_prediction = 0
-            shap_values = [0.0, 0.0, 0.0]
-            if ai_is_ready:
-                latest_scaled = scaler.transform(current_metrics)
-                prediction = model.predict(latest_scaled)
-                model_prediction = 1 if prediction[0] == -1 else 0
-
-                # STEP 3.1: SHAP Explainability (optional)
-                if shap_explainer is not None:
-                    try:
-                        shap_vals = shap_explainer.shap_values(latest_scaled)
-                        if isinstance(shap_vals, list):
-                            shap_vals = shap_vals[0]
-                        shap_values = shap_vals[0].tolist()
-                        logger.debug(
-                            "SHAP contributions - CPU: %.3f, Memory: %.3f, Network: %.3f",
-                            shap_values[0], shap_values[1], shap_values[2]
-                        )
-                    except Exception as shap_err:
-                        logger.debug("SHAP calculation skipped: %s", shap_err)
-
-            # STEP 3.5: TEMPORAL BUFFERING + SURGE GATING
-            # Only alert if anomaly is sustained AND CPU/MEM/NET is >= threshold
-            surge_condition = (
-                (cpu_val >= CPU_SURGE_THRESHOLD) or
-                (mem_val >= MEM_SURGE_THRESHOLD) or
-                (net_val >= NET_SURGE_THRESHOLD)
-            )
-
-            global anomaly_counter
-            if model_prediction == 1 and surge_condition:
-                anomaly_counter += 1
-                # Only report anomaly if we have 12+ consecutive detections (2 min)
-                ai_status = 1 if anomaly_counter >= ANOMALY_THRESHOLD else 0
-            else:
-                # Reset counter when normal or below surge threshold
-                anomaly_counter = 0
-                ai_status = 0
-
-            # STEP 4: SYNC WITH GRAFANA
-            json_body = [{
-                "measurement": "ai_predictions",
-                "fields": {
-                    "is_anomaly": ai_status,
-                    "cpu_val": cpu_val,
-                    "mem_val": mem_val,
-                    "net_val": net_val,
-                    "shap_cpu": float(shap_values[0]),
-                    "shap_memory": float(shap_values[1]),
-                    "shap_network": float(shap_values[2])
-                }
-            }]
-            client.write_points(json_body)
-
-            # 🔧 CHANGED: Learn ONLY from NORMAL behavior
-            # 🔧 CRITICAL: Use model_prediction (raw) not ai_status (buffered) for training
-            # This ensures anomalous data NEVER enters training, even during buffering period
-            if model_prediction == 0:
-                updated_memory = pd.concat(
-                    [historical_df[features], current_metrics],
-                    ignore_index=True
-                ).tail(2000)
-                updated_memory.to_csv(HISTORICAL_DATA_PATH, index=False)
-            else:
-                # 🔧 NEW: Save detected anomaly for later testing
-                save_detected_anomaly(cpu_val, mem_val, net_val)
-                updated_memory = historical_df[features]
-
-            # 🔧 CHANGED: Retrain model every 5 minutes instead of every loop
-            if len(updated_memory) >= 30 and (time.time() - last_retrain_time) > 300:
-                scaler = StandardScaler()
-                scaled_features = scaler.fit_transform(updated_memory)
-
-                model = IsolationForest(
-                    contamination=0.05,
-                    random_state=42
-                ).fit(scaled_features)
-
-                joblib.dump(model, MODEL_PATH)
-                joblib.dump(scaler, SCALER_PATH)
-
-                ai_is_ready = True
-                last_retrain_time = time.time()
-                logger.info("Model retrained with %s samples", len(updated_memory))
-
-                # Reinitialize SHAP explainer after retraining
-                if SHAP_AVAILABLE:
-                    try:
-                        shap_explainer = shap.TreeExplainer(model)
-                        logger.debug("SHAP explainer reinitialized after retraining")
-                    except Exception as shap_err:
-                        logger.warning("Failed to reinitialize SHAP explainer: %s", shap_err)
-                        shap_explainer = None
-                
-                # 🔧 NEW: Evaluate model on COLLECTED ANOMALIES for real metrics
-                if os.path.exists(DETECTED_ANOMALIES_PATH) and os.path.getsize(DETECTED_ANOMALIES_PATH) > 0:
-                    try:
-                        # Load collected anomalies
-                        anomaly_data = pd.read_csv(DETECTED_ANOMALIES_PATH)
-                        if len(anomaly_data) > 0:
-                            anomaly_features = anomaly_data[features]
-                            
-                            # Scale anomalies with trained scaler
-                            anomaly_scaled = scaler.transform(anomaly_features)
-                            
-                            # Predict on real collected anomalies
-                            anomaly_predictions = model.predict(anomaly_scaled)
-                            detected_count = (anomaly_predictions == -1).sum()
-                            
-                            # Calculate metrics
-                            # True labels: all are anomalies (1)
-                            true_labels = np.ones(len(anomaly_data))
-                            pred_labels = (anomaly_predictions == -1).astype(int)
-                            
-                            metrics = {
-                                "f1_score": float(f1_score(true_labels, pred_labels, zero_division=0)),
-                                "precision": float(precision_score(true_labels, pred_labels, zero_division=0)),
-                                "recall": float(recall_score(true_labels, pred_labels, zero_division=0)),
-                                "test_anomalies": int(detected_count),
-                                "total_test_samples": len(anomaly_data)
-                            }
-                            
-                            logger.info(
-                                "Model evaluated on %d collected anomalies - F1: %.3f, Precision: %.3f, Recall: %.3f, Detected: %d",
-                                len(anomaly_data), metrics["f1_score"], metrics["precision"], metrics["recall"], detected_count
-                            )
-                            log_retrain_to_mlflow(model, len(updated_memory), metrics)
-                        else:
-                            log_retrain_to_mlflow(model, len(updated_memory))
-                    except Exception as e:
-                        logger.warning("Error evaluating on anomalies: %s", e)
-                        log_retrain_to_mlflow(model, len(updated_memory))
-                else:
-                    # No anomalies collected yet
-                    log_retrain_to_mlflow(model, len(updated_memory))
+    # Count anomalies already on disk so retrain evaluation uses them after a restart
+    try:
+        open_detected_anomalies()
+    except Exception as e:
+        logger.warning("Failed to open anomaly file: %s", e)
 
-            status_txt = "ANOMALY!!" if ai_status else "Normal"
-            logger.info("Monitoring synced. Status: %s", status_txt)
+    next_tick = time.monotonic()
 
-        else:
-            logger.info("Waiting for Site B metrics...")
+    try:
+        while True:
+            next_tick += POLL_INTERVAL_SEC
+            live_arr = fetch_live_logs()
+
+            if live_arr is not None:
+                cpu_val, mem_val, net_val = live_arr[0].tolist()
+
+                # STEP 3: IMMEDIATE DETECTION (Raw model output)
+                model_prediction = 0
+                shap_values = [0.0, 0.0, 0.0]
+                if ai_is_ready:
+                    # Same as scaler.transform, minus sklearn's per-call validation overhead
+                    latest_scaled[0, 0] = cpu_val
+                    latest_scaled[0, 1] = mem_val
+                    latest_scaled[0, 2] = net_val
+                    np.subtract(latest_scaled, scaler_mean, out=latest_scaled)
+                    np.divide(latest_scaled, scaler_scale, out=latest_scaled)
+                    with parallel_backend('threading'):
+                        prediction = model.predict(latest_scaled)
+                    model_prediction = 1 if prediction[0] == -1 else 0
+
+                    # STEP 3.1: SHAP Explainability (optional)
+                    if shap_explainer is not None:
+                        try:
+                            shap_vals = shap_explainer.shap_values(latest_scaled)
+                            if isinstance(shap_vals, list):
+                                shap_vals = shap_vals[0]
+                            shap_values = shap_vals[0].tolist()
+                            logger.debug(
+                                "SHAP contributions - CPU: %.3f, Memory: %.3f, Network: %.3f",
+                                shap_values[0], shap_values[1], shap_values[2]
+                            )
+                        except Exception as shap_err:
+                            logger.debug("SHAP calculation skipped: %s", shap_err)
+
+                # STEP 3.5: TEMPORAL BUFFERING + SURGE GATING
+                # Only alert if anomaly is sustained AND CPU/MEM/NET is >= threshold
+                # Report anomaly only after 12+ consecutive detections (2 min)
+                global anomaly_counter
+                ai_status, anomaly_counter = surge_gate(
+                    cpu_val, mem_val, net_val, model_prediction, anomaly_counter,
+                    CPU_SURGE_THRESHOLD, MEM_SURGE_THRESHOLD, NET_SURGE_THRESHOLD, ANOMALY_THRESHOLD
+                )
+
+                # STEP 4: SYNC WITH GRAFANA (timestamped now, flushed in batches)
+                pending_points.append(
+                    f"ai_predictions is_anomaly={ai_status}i,"
+                    f"cpu_val={cpu_val},mem_val={mem_val},net_val={net_val},"
+                    f"shap_cpu={float(shap_values[0])},shap_memory={float(shap_values[1])},"
+                    f"shap_network={float(shap_values[2])} {time.time_ns()}"
+                )
+                if len(pending_points) >= PREDICTION_FLUSH_TICKS:
+                    flush_predictions()
+
+                # 🔧 CHANGED: Learn ONLY from NORMAL behavior
+                # 🔧 CRITICAL: Use model_prediction (raw) not ai_status (buffered) for training
+                # This ensures anomalous data NEVER enters training, even during buffering period
+                if model_prediction == 0:
+                    append_core_memory(core_memory, core_memory_index, cpu_val, mem_val, net_val)
+                    if len(updated_memory) < CORE_MEMORY_SIZE:
+                        # Still filling up: widen the view to include the new row
+                        updated_memory = load_core_memory(core_memory, core_memory_index)
+                else:
+                    # 🔧 NEW: Save detected anomaly for later testing
+                    save_detected_anomaly(cpu_val, mem_val, net_val)
+
+                # 🔧 CHANGED: Retrain model every 5 minutes instead of every loop
+                if len(updated_memory) >= 30 and (time.time() - last_retrain_time) > 300:
+                    scaler = StandardScaler()
+                    scaled_features = scaler.fit_transform(updated_memory).astype(np.float32, copy=False)
+
+                    # Trees are independent; build and score them on all cores
+                    # max_features=1.0 + bootstrap=False keep sklearn on the path that
+                    # skips per-estimator feature/sample indexing
+                    model = IsolationForest(
+                        contamination=0.05,
+                        random_state=42,
+                        n_jobs=-1,
+                        n_estimators=100,
+                        max_features=1.0,
+                        bootstrap=False
+                    )
+                    with parallel_backend('threading'):
+                        model.fit(scaled_features)
+
+                    dump_artifact(model, MODEL_PATH)
+                    dump_artifact(scaler, SCALER_PATH)
+                    scaler_mean, scaler_scale = scaler.mean_, scaler.scale_
+
+                    ai_is_ready = True
+                    last_retrain_time = time.time()
+                    logger.info("Model retrained with %s samples", len(updated_memory))
+
+                    # Reinitialize SHAP explainer after retraining
+                    if SHAP_AVAILABLE:
+                        try:
+                            shap_explainer = shap.TreeExplainer(model)
+                            logger.debug("SHAP explainer reinitialized after retraining")
+                        except Exception as shap_err:
+                            logger.warning("Failed to reinitialize SHAP explainer: %s", shap_err)
+                            shap_explainer = None
+                    
+                    # 🔧 NEW: Evaluate model on COLLECTED ANOMALIES for real metrics
+                    if anomaly_file_rows > 0:
+                        try:
+                            # Load collected anomalies
+                            anomaly_data = pd.read_csv(DETECTED_ANOMALIES_PATH)
+                            # The file may run up to DETECTED_ANOMALIES_SLACK_ROWS past the cap
+                            anomaly_data = anomaly_data.iloc[-DETECTED_ANOMALIES_MAX_ROWS:]
+                            if len(anomaly_data) > 0:
+                                anomaly_features = anomaly_data[features].to_numpy()
+                                
+                                # Scale anomalies with trained scaler
+                                anomaly_scaled = scaler.transform(anomaly_features).astype(np.float32, copy=False)
+                                
+                                # Predict on real collected anomalies
+                                with parallel_backend('threading'):
+                                    anomaly_predictions = model.predict(anomaly_scaled)
+                                detected_count = int((anomaly_predictions == -1).sum())
+                                
+                                # Calculate metrics
+                                # True labels are all anomalies (1), so FP = 0 and FN = missed anomalies
+                                tp = detected_count
+                                fn = len(anomaly_data) - detected_count
+                                precision = 1.0 if tp else 0.0
+                                recall = tp / (tp + fn)
+                                f1 = 2 * precision * recall / (precision + recall) if tp else 0.0
+                                
+                                metrics = {
+                                    "f1_score": f1,
+                                    "precision": precision,
+                                    "recall": recall,
+                                    "test_anomalies": int(detected_count),
+                                    "total_test_samples": len(anomaly_data)
+                                }
+                                
+                                logger.info(
+                                    "Model evaluated on %d collected anomalies - F1: %.3f, Precision: %.3f, Recall: %.3f, Detected: %d",
+                                    len(anomaly_data), metrics["f1_score"], metrics["precision"], metrics["recall"], detected_count
+                                )
+                                mlflow_executor.submit(log_retrain_to_mlflow, model, len(updated_memory), metrics)
+                            else:
+                                mlflow_executor.submit(log_retrain_to_mlflow, model, len(updated_memory))
+                        except Exception as e:
+                            logger.warning("Error evaluating on anomalies: %s", e)
+                            mlflow_executor.submit(log_retrain_to_mlflow, model, len(updated_memory))
+                    else:
+                        # No anomalies collected yet
+                        mlflow_executor.submit(log_retrain_to_mlflow, model, len(updated_memory))
+
+                status_txt = "ANOMALY!!" if ai_status else "Normal"
+                logger.info("Monitoring synced. Status: %s", status_txt)
 
-        time.sleep(10)
+            else:
+                logger.info("Waiting for Site B metrics...")
+
+            # Sleep only for what is left of this tick, so query/predict/write time
+            # overlaps the interval instead of stretching it
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+    finally:
+        # Don't lose up to PREDICTION_FLUSH_TICKS buffered predictions on shutdown
+        try:
+            flush_predictions()
+        except Exception as e:
+            logger.warning("Failed to flush predictions on shutdown: %s", e)
+        mlflow_executor.shutdown(wait=True)
 
 if __name__ == "__main__":
     run_pipeline()
\ No newline at end of file
@@ -17,23 +17,42 @@ Usage:
     )
     
     anomaly_score, is_anomaly, model_votes = detector.predict(
-        cpu=45.2,
-        memory=62.1,
-        network=1250.5
+        np.array([45.2, 62.1, 1250.5])  # cpu, memory, network
     )
+    
+    # Score many samples at once (one pass per model)
+    anomaly_scores, is_anomaly, model_votes = detector.predict_batch(X)  # X: (N, 3)
+    
+    detector.close()  # or use the detector as a context manager
 """
 
 import joblib
 import numpy as np
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Dict, List
 from sklearn.preprocessing import StandardScaler
+from sklearn.neighbors import LocalOutlierFactor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _score_one(model, features_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Binary predictions (1=anomaly) and anomaly scores from one model."""
+    # Convert predictions to binary (1=anomaly, 0=normal)
+    model_predictions = (model.predict(features_scaled) == -1).astype(np.int64)
+    
+    # Get anomaly scores
+    if hasattr(model, 'score_samples'):
+        model_scores = model.score_samples(features_scaled)
+    else:
+        model_scores = model.decision_function(features_scaled)
+    
+    return model_predictions, model_scores
+
+
 class EnsembleDetector:
     """Ensemble anomaly detector combining multiple models."""
     
@@ -41,7 +60,7 @@ class EnsembleDetector:
     MODEL_WEIGHTS = {
         "isolation_forest_model.pkl": 0.40,      # Best balanced
         "elliptic_envelope_model.pkl": 0.35,     # Fast + accurate
-        "lof_model_model.pkl": 0.25               # Catches local anomalies
+        "lof_model_model.pkl": 0.25               # Catches local anomalies (must be fitted with novelty=True)
     }
     
     ENSEMBLE_STRATEGIES = {
@@ -72,20 +91,33 @@ class EnsembleDetector:
         
         # Load scaler
         if scaler_path and os.path.exists(scaler_path):
-            self.scaler = joblib.load(scaler_path)
+            self.scaler = joblib.load(scaler_path, mmap_mode='r')
             logger.info("✅ Loaded scaler from: %s", scaler_path)
         else:
             # Try to find scaler in models_dir
             default_scaler = os.path.join(models_dir, "scaler.pkl")
             if os.path.exists(default_scaler):
-                self.scaler = joblib.load(default_scaler)
+                self.scaler = joblib.load(default_scaler, mmap_mode='r')
                 logger.info("✅ Loaded scaler from: %s", default_scaler)
         
         # Load all models
         self._load_models()
         
+        # One worker per model: sklearn's predict paths release the GIL
+        self._pool = ThreadPoolExecutor(max_workers=len(self.models))
+        
         logger.info("✅ Initialized ensemble detector (strategy: %s)", self.strategy)
     
+    def close(self):
+        """Shut down the per-model scoring threads."""
+        self._pool.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
     def _load_models(self):
         """Load all trained models from directory."""
         if not os.path.exists(self.models_dir):
@@ -100,7 +132,10 @@ class EnsembleDetector:
         for model_file in model_files:
             model_path = os.path.join(self.models_dir, model_file)
             try:
-                model = joblib.load(model_path)
+                # Memory-map stored arrays instead of copying them onto the heap
+                model = joblib.load(model_path, mmap_mode='r')
+                if isinstance(model, LocalOutlierFactor) and not model.novelty:
+                    raise RuntimeError("LOF model must be fitted with novelty=True for inference")
                 self.models[model_file] = model
                 logger.info("✅ Loaded model: %s", model_file)
             except Exception as e:
@@ -125,116 +160,135 @@ class EnsembleDetector:
         if len(features) != 3:
             raise ValueError(f"Expected 3 features, got {len(features)}")
         
-        # Scale features
+        ensemble_scores, final_predictions, batch_votes = self.predict_batch(
+            np.asarray(features, dtype=np.float64).reshape(1, 3)
+        )
+        
+        model_votes = {}
+        for model_name, vote in batch_votes.items():
+            if "error" in vote:
+                model_votes[model_name] = vote
+            else:
+                model_votes[model_name] = {
+                    "prediction": int(vote["predictions"][0]),
+                    "score": float(vote["scores"][0])
+                }
+        
+        return float(ensemble_scores[0]), int(final_predictions[0]), model_votes
+    
+    def predict_batch(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Dict]:
+        """
+        Predict anomalies for a batch of samples in one pass per model.
+        
+        Args:
+            features: Array of shape (N, 3) [cpu, memory, network]
+        
+        Returns:
+            (anomaly_scores, is_anomaly, votes_dict)
+            - anomaly_scores: shape (N,), 0.0-1.0, higher = more anomalous
+            - is_anomaly: shape (N,), 0 (normal) or 1 (anomaly)
+            - votes_dict: Per-model prediction and score arrays
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim != 2 or features.shape[1] != 3:
+            raise ValueError(f"Expected shape (N, 3), got {features.shape}")
+        
+        # Scale features once for the whole batch
         if self.scaler:
-            features_scaled = self.scaler.transform([features])[0]
+            features_scaled = self.scaler.transform(features)
         else:
             features_scaled = features
         
-        # Get predictions from all models
         model_votes = {}
-        anomaly_scores = []
+        model_names = []
+        predictions = []
+        scores = []
+        
+        # Get predictions from all models concurrently
+        futures = {
+            model_name: self._pool.submit(_score_one, model, features_scaled)
+            for model_name, model in self.models.items()
+        }
         
-        for model_name, model in self.models.items():
+        for model_name, future in futures.items():
             try:
-                # Predict
-                prediction = model.predict([features_scaled])[0]
+                model_predictions, model_scores = future.result()
                 
-                # Get anomaly score
-                if hasattr(model, 'score_samples'):
-                    score = model.score_samples([features_scaled])[0]
-                else:
-                    score = model.decision_function([features_scaled])[0]
-                
-                # Convert prediction to binary (1=anomaly, 0=normal)
-                is_anomaly = 1 if prediction == -1 else 0
-                anomaly_scores.append(score)
+                model_names.append(model_name)
+                predictions.append(model_predictions)
+                scores.append(model_scores)
                 
                 model_votes[model_name] = {
-                    "prediction": int(is_anomaly),
-                    "score": float(score)
+                    "predictions": model_predictions,
+                    "scores": model_scores
                 }
                 
             except Exception as e:
                 logger.warning("Model %s failed: %s", model_name, str(e))
                 model_votes[model_name] = {"error": str(e)}
         
+        n_samples = len(features)
+        if not model_names:
+            return np.zeros(n_samples), np.zeros(n_samples, dtype=np.int64), model_votes
+        
+        # (n_models, n_samples) matrices
+        prediction_matrix = np.stack(predictions)
+        score_matrix = np.abs(np.stack(scores))
+        
         # Combine predictions using ensemble strategy
         if self.strategy == "hard":
-            ensemble_score, final_prediction = self._hard_voting(model_votes)
+            ensemble_scores, final_predictions = self._hard_voting(prediction_matrix)
         elif self.strategy == "soft":
-            ensemble_score, final_prediction = self._soft_voting(model_votes)
+            ensemble_scores, final_predictions = self._soft_voting(score_matrix)
         elif self.strategy == "weighted":
-            ensemble_score, final_prediction = self._weighted_voting(model_votes)
+            ensemble_scores, final_predictions = self._weighted_voting(score_matrix, model_names)
         
-        return ensemble_score, final_prediction, model_votes
+        return ensemble_scores, final_predictions, model_votes
     
-    def _hard_voting(self, model_votes: Dict) -> Tuple[float, int]:
+    def _hard_voting(self, prediction_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Majority voting: anomaly if ≥2/3 models agree."""
-        predictions = [v["prediction"] for v in model_votes.values() 
-                      if "prediction" in v]
-        
-        if not predictions:
-            return 0.0, 0
-        
-        anomaly_count = sum(predictions)
-        total_models = len(predictions)
+        total_models = prediction_matrix.shape[0]
+        anomaly_count = prediction_matrix.sum(axis=0)
         
         # Score = ratio of models detecting anomaly
-        score = anomaly_count / total_models
+        scores = anomaly_count / total_models
         
         # Anomaly if ≥2/3 models agree
-        final_prediction = 1 if anomaly_count >= (total_models * 2 / 3) else 0
+        final_predictions = (anomaly_count >= total_models * 2 / 3).astype(np.int64)
         
-        return score, final_prediction
+        return scores, final_predictions
     
-    def _soft_voting(self, model_votes: Dict) -> Tuple[float, int]:
+    def _soft_voting(self, score_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Average anomaly scores."""
-        scores = [abs(v["score"]) for v in model_votes.values() 
-                 if "score" in v]
-        
-        if not scores:
-            return 0.0, 0
+        # Normalize scores to 0-1 range (per sample, by the largest model score)
+        max_scores = score_matrix.max(axis=0)
+        max_scores[max_scores == 0] = 1.0
         
-        # Normalize scores to 0-1 range
-        max_score = max(scores) if scores else 1.0
-        if max_score == 0:
-            max_score = 1.0
-        
-        normalized_scores = [s / max_score for s in scores]
-        ensemble_score = np.mean(normalized_scores)
+        ensemble_scores = (score_matrix / max_scores).mean(axis=0)
         
         # Classify based on threshold
-        final_prediction = 1 if ensemble_score >= self.threshold else 0
+        final_predictions = (ensemble_scores >= self.threshold).astype(np.int64)
         
-        return ensemble_score, final_prediction
+        return ensemble_scores, final_predictions
     
-    def _weighted_voting(self, model_votes: Dict) -> Tuple[float, int]:
+    def _weighted_voting(self, score_matrix: np.ndarray, model_names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
         """Weighted average by model performance."""
-        weighted_sum = 0.0
-        weight_sum = 0.0
-        
-        for model_name, vote in model_votes.items():
-            if "score" in vote:
-                weight = self.MODEL_WEIGHTS.get(model_name, 1.0 / len(self.models))
-                score = abs(vote["score"])
-                weighted_sum += score * weight
-                weight_sum += weight
+        weights = np.array([
+            self.MODEL_WEIGHTS.get(model_name, 1.0 / len(self.models))
+            for model_name in model_names
+        ])
         
-        if weight_sum == 0:
-            return 0.0, 0
+        ensemble_scores = weights @ score_matrix / weights.sum()
         
         # Normalize to 0-1
-        ensemble_score = weighted_sum / weight_sum if weight_sum > 0 else 0.0
-        max_score = max([abs(v["score"]) for v in model_votes.values() 
-                        if "score" in v], default=1.0)
-        if max_score > 0:
-            ensemble_score = ensemble_score / max_score
+        max_scores = score_matrix.max(axis=0)
+        max_scores[max_scores == 0] = 1.0
+        ensemble_scores = ensemble_scores / max_scores
         
         # Classify based on threshold
-        final_prediction = 1 if ensemble_score >= self.threshold else 0
+        final_predictions = (ensemble_scores >= self.threshold).astype(np.int64)
         
-        return ensemble_score, final_prediction
+        return ensemble_scores, final_predictions
     
     def get_strategy_info(self) -> str:
         """Get information about ensemble strategy."""
@@ -254,32 +308,31 @@ if __name__ == "__main__":
     
     # Initialize ensemble
     try:
-        ensemble = EnsembleDetector(
+        with EnsembleDetector(
             models_dir="models/",
             strategy="soft"
-        )
-        
-        # Example predictions
-        test_cases = [
-            ("Normal", np.array([30.0, 45.0, 500.0])),
-            ("CPU Spike", np.array([85.0, 50.0, 600.0])),
-            ("Memory High", np.array([35.0, 90.0, 700.0])),
-            ("Network Burst", np.array([40.0, 55.0, 8000.0])),
-        ]
-        
-        print("\n" + "=" * 80)
-        print("ENSEMBLE PREDICTION EXAMPLES")
-        print("=" * 80)
-        print(f"Strategy: {ensemble.get_strategy_info()}\n")
-        
-        for test_name, features in test_cases:
-            score, pred, votes = ensemble.predict(features)
-            print(f"{test_name}:")
-            print(f"  Features: CPU={features[0]:.1f}%, MEM={features[1]:.1f}%, NET={features[2]:.1f}bps")
-            print(f"  Ensemble Score: {score:.4f}")
-            print(f"  Prediction: {'🔴 ANOMALY' if pred == 1 else '🟢 NORMAL'}")
-            print(f"  Model Votes: {votes}")
-            print()
+        ) as ensemble:
+            # Example predictions
+            test_cases = [
+                ("Normal", np.array([30.0, 45.0, 500.0])),
+                ("CPU Spike", np.array([85.0, 50.0, 600.0])),
+                ("Memory High", np.array([35.0, 90.0, 700.0])),
+                ("Network Burst", np.array([40.0, 55.0, 8000.0])),
+            ]
+            
+            print("\n" + "=" * 80)
+            print("ENSEMBLE PREDICTION EXAMPLES")
+            print("=" * 80)
+            print(f"Strategy: {ensemble.get_strategy_info()}\n")
+            
+            for test_name, features in test_cases:
+                score, pred, votes = ensemble.predict(features)
+                print(f"{test_name}:")
+                print(f"  Features: CPU={features[0]:.1f}%, MEM={features[1]:.1f}%, NET={features[2]:.1f}bps")
+                print(f"  Ensemble Score: {score:.4f}")
+                print(f"  Prediction: {'🔴 ANOMALY' if pred == 1 else '🟢 NORMAL'}")
+                print(f"  Model Votes: {votes}")
+                print()
         
     except Exception as e:
         logger.error("Error: %s", str(e))
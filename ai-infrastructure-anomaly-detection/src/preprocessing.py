@@ -1,7 +1,14 @@
 import pandas as pd
+import numpy as np
 from sklearn.preprocessing import StandardScaler
 import os
 
+try:
+    import pyarrow  # noqa: F401 - enables pandas' multithreaded Arrow CSV reader
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
 # -------------------------------
 # Paths
 # -------------------------------
@@ -12,7 +19,7 @@ OUTPUT_PATH = os.path.join(BASE_DIR, "data/processed/system_metrics_processed.cs
 # -------------------------------
 # Load data
 # -------------------------------
-data = pd.read_csv(INPUT_PATH)
+data = pd.read_csv(INPUT_PATH, engine=CSV_ENGINE)
 
 # -------------------------------
 # Select features
@@ -29,7 +36,9 @@ X_scaled = scaler.fit_transform(X)
 # -------------------------------
 # Save processed data
 # -------------------------------
-processed_data = pd.DataFrame(X_scaled, columns=features)
+# float32: standardized telemetry needs no more precision (IsolationForest
+# works in float32 anyway), and the shorter text makes the CSV faster to parse
+processed_data = pd.DataFrame(X_scaled.astype(np.float32), columns=features)
 processed_data["anomaly"] = data["anomaly"]
 
 processed_data.to_csv(OUTPUT_PATH, index=False)
@@ -22,23 +22,28 @@ Output:
 import pandas as pd
 import numpy as np
 import joblib
+from joblib import Parallel, delayed
 import json
 import os
+import socket
+import functools
 import logging
 from datetime import datetime
 from sklearn.ensemble import IsolationForest
 from sklearn.neighbors import LocalOutlierFactor
-from sklearn.covariance import EllipticEnvelope
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import (
-    precision_score, recall_score, f1_score,
-    roc_auc_score, confusion_matrix
-)
+from sklearn.metrics import roc_auc_score
+from empirical_envelope import EmpiricalEllipticEnvelope
 
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import pyarrow  # noqa: F401 - enables pandas' multithreaded Arrow CSV reader
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
 try:
     import mlflow
     from mlflow.models.signature import infer_signature
@@ -59,16 +64,85 @@ HISTORICAL_DATA_PATH = os.path.join(BASE_DIR, "data/processed/system_metrics_pro
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
 MLFLOW_EXPERIMENT_NAME = "multi_model_anomaly_detection"
+N_JOBS = int(os.getenv("N_JOBS", "-1"))  # Cores used by the parallel estimators (-1 = all)
 
 os.makedirs(MODEL_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+MLFLOW_HOST = "mlflow"
+MLFLOW_PORT = 5000
+MLFLOW_PROBE_TIMEOUT_SEC = 0.25
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_mlflow_uri():
+    """Tracking URI: the MLflow server if it accepts a connection, else local file store (probed once)."""
+    try:
+        socket.create_connection((MLFLOW_HOST, MLFLOW_PORT), timeout=MLFLOW_PROBE_TIMEOUT_SEC).close()
+        return f"http://{MLFLOW_HOST}:{MLFLOW_PORT}"
+    except OSError:
+        return f"file:{os.path.join(BASE_DIR, '.mlflow')}"
+
+
 # MLflow configuration
 if MLFLOW_AVAILABLE:
+    mlflow.set_tracking_uri(_resolve_mlflow_uri())
+
+
+def _train_one(model_name, model_config, X_train_scaled, X_test_scaled, y_true, contamination):
+    """Fit one model and score it on the test set; returns (name, fitted model or None, results)."""
     try:
-        mlflow.set_tracking_uri("http://mlflow:5000")
-    except:
-        mlflow.set_tracking_uri(os.path.join(BASE_DIR, ".mlflow"))
+        model = model_config["model"]
+        
+        # Train (unless the caller already fitted it)
+        if not model_config.get("fitted", False):
+            model.fit(X_train_scaled)
+        
+        # Predict on test set
+        y_pred = model.predict(X_test_scaled)
+        y_pred_binary = (y_pred == -1).astype(int)
+        
+        # Get anomaly scores
+        if hasattr(model, 'score_samples'):
+            y_scores = model.score_samples(X_test_scaled)
+        else:
+            y_scores = model.decision_function(X_test_scaled)
+        
+        # Calculate metrics from one set of confusion counts
+        yt = y_true[:len(y_pred)].astype(np.bool_)
+        yp = y_pred_binary.astype(np.bool_)
+        tp = int(np.count_nonzero(yt & yp))
+        fp = int(np.count_nonzero(~yt & yp))
+        fn = int(np.count_nonzero(yt & ~yp))
+        tn = len(yt) - tp - fp - fn
+        
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        
+        try:
+            roc_auc = roc_auc_score(yt, y_scores)
+        except:
+            roc_auc = 0.0
+        
+        result = {
+            "description": model_config["description"],
+            "precision": round(float(precision), 4),
+            "recall": round(float(recall), 4),
+            "f1_score": round(float(f1), 4),
+            "roc_auc": round(float(roc_auc), 4),
+            "true_positives": int(tp),
+            "false_positives": int(fp),
+            "true_negatives": int(tn),
+            "false_negatives": int(fn),
+            "contamination": contamination,
+            "trained_at": datetime.now().isoformat(),
+            "status": "✅ Success"
+        }
+        return model_name, model, result
+        
+    except Exception as e:
+        return model_name, None, {"status": f"❌ Error: {str(e)}"}
 
 
 class MultiModelTrainer:
@@ -88,8 +162,9 @@ class MultiModelTrainer:
         if not os.path.exists(HISTORICAL_DATA_PATH):
             raise FileNotFoundError(f"Data not found: {HISTORICAL_DATA_PATH}")
         
-        df = pd.read_csv(HISTORICAL_DATA_PATH)
         features = ["cpu_usage", "memory_usage", "network_load"]
+        # Declared dtypes skip per-column type inference
+        df = pd.read_csv(HISTORICAL_DATA_PATH, engine=CSV_ENGINE, dtype={feat: np.float64 for feat in features})
         
         for feat in features:
             if feat not in df.columns:
@@ -101,123 +176,93 @@ class MultiModelTrainer:
         return X
     
     def split_data(self, X, test_size=0.15, val_size=0.15):
-        """Split data into train/val/test."""
-        X_train, X_temp = train_test_split(
-            X, test_size=(test_size + val_size),
-            random_state=self.random_state
-        )
+        """Split data into train/val/test row indices (no copies of X)."""
+        # One seeded permutation gives all three disjoint, reproducible splits
+        rng = np.random.default_rng(self.random_state)
+        idx = rng.permutation(len(X))
+        n_train = len(X) - int(len(X) * (test_size + val_size))
+        n_val = int(len(X) * val_size)
         
-        X_val, X_test = train_test_split(
-            X_temp, test_size=0.5,
-            random_state=self.random_state
-        )
+        train_idx = idx[:n_train]
+        val_idx = idx[n_train:n_train + n_val]
+        test_idx = idx[n_train + n_val:]
         
         logger.info("Data split - Train: %d, Val: %d, Test: %d",
-                   len(X_train), len(X_val), len(X_test))
+                   len(train_idx), len(val_idx), len(test_idx))
         
-        return X_train, X_val, X_test
+        return train_idx, val_idx, test_idx
     
-    def train_models(self, X_train, X_val, X_test):
+    def train_models(self, X, train_idx, val_idx, test_idx):
         """Train all models."""
-        # Scale data
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_val_scaled = self.scaler.transform(X_val)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Scale data, gathering each split's rows only for the transform
+        # (float32: the forest's working dtype, half the bytes per pass)
+        X_train_scaled = np.ascontiguousarray(self.scaler.fit_transform(X[train_idx]), dtype=np.float32)
+        X_val_scaled = np.ascontiguousarray(self.scaler.transform(X[val_idx]), dtype=np.float32)
+        X_test_scaled = np.ascontiguousarray(self.scaler.transform(X[test_idx]), dtype=np.float32)
         
-        # Create ground truth using Isolation Forest (reference model)
+        # Create ground truth using Isolation Forest (reference model); the same
+        # fitted forest is kept as the ensemble's isolation_forest member
         logger.info("Creating pseudo-labels using Isolation Forest as reference...")
-        iso_ref = IsolationForest(contamination=self.contamination, random_state=self.random_state)
-        y_true = iso_ref.fit_predict(X_train_scaled)
+        iso = IsolationForest(
+            contamination=self.contamination,
+            n_estimators=100,
+            random_state=self.random_state,
+            max_samples='auto',
+            n_jobs=N_JOBS
+        )
+        y_true = iso.fit_predict(X_train_scaled)
         y_true = (y_true == -1).astype(int)  # Convert to binary (1=anomaly)
         
         # Define models
         models_config = {
             "isolation_forest": {
-                "model": IsolationForest(
-                    contamination=self.contamination,
-                    n_estimators=100,
-                    random_state=self.random_state,
-                    max_samples='auto'
-                ),
+                "model": iso.set_params(n_jobs=1),
+                "fitted": True,  # Already fitted above for the pseudo-labels
                 "description": "Isolation Forest - Unsupervised ensemble method"
             },
             "elliptic_envelope": {
-                "model": EllipticEnvelope(
-                    contamination=self.contamination,
-                    random_state=self.random_state,
-                    support_fraction=0.95
+                "model": EmpiricalEllipticEnvelope(
+                    contamination=self.contamination
                 ),
-                "description": "Elliptic Envelope - Robust covariance estimation"
+                "description": "Elliptic Envelope - Empirical covariance estimation"
             },
             "lof": {
                 "model": LocalOutlierFactor(
                     n_neighbors=20,
                     contamination=self.contamination,
-                    novelty=False
+                    novelty=True,  # Required for predict/score_samples on new data
+                    algorithm="kd_tree",  # Low-dimensional data: exact kd-tree neighbor queries
+                    n_jobs=1
                 ),
                 "description": "Local Outlier Factor - Density-based detection"
             }
         }
         
-        # Train each model
-        for model_name, model_config in models_config.items():
+        # Models are independent: fit them concurrently, one worker process each.
+        # Estimators inside the pool run with n_jobs=1 so the workers don't each
+        # claim every core; N_JOBS caps the fan-out instead
+        n_workers = min(len(models_config), joblib.effective_n_jobs(N_JOBS))
+        trained = Parallel(n_jobs=n_workers, backend="loky")(
+            delayed(_train_one)(model_name, model_config, X_train_scaled, X_test_scaled, y_true, self.contamination)
+            for model_name, model_config in models_config.items()
+        )
+        
+        for model_name, model, result in trained:
             logger.info("-" * 60)
-            logger.info("Training: %s", model_config["description"])
+            logger.info("Trained: %s", models_config[model_name]["description"])
             logger.info("-" * 60)
             
-            try:
-                model = model_config["model"]
-                
-                # Train
-                model.fit(X_train_scaled)
-                self.models[model_name] = model
-                
-                # Predict on test set
-                y_pred = model.predict(X_test_scaled)
-                y_pred_binary = (y_pred == -1).astype(int)
-                
-                # Get anomaly scores
-                if hasattr(model, 'score_samples'):
-                    y_scores = model.score_samples(X_test_scaled)
-                else:
-                    y_scores = model.decision_function(X_test_scaled)
-                
-                # Calculate metrics
-                precision = precision_score(y_true[:len(y_pred)], y_pred_binary, zero_division=0)
-                recall = recall_score(y_true[:len(y_pred)], y_pred_binary, zero_division=0)
-                f1 = f1_score(y_true[:len(y_pred)], y_pred_binary, zero_division=0)
-                
-                try:
-                    roc_auc = roc_auc_score(y_true[:len(y_pred)], y_scores)
-                except:
-                    roc_auc = 0.0
-                
-                tn, fp, fn, tp = confusion_matrix(y_true[:len(y_pred)], y_pred_binary).ravel()
-                
-                # Store results
-                self.results[model_name] = {
-                    "description": model_config["description"],
-                    "precision": round(float(precision), 4),
-                    "recall": round(float(recall), 4),
-                    "f1_score": round(float(f1), 4),
-                    "roc_auc": round(float(roc_auc), 4),
-                    "true_positives": int(tp),
-                    "false_positives": int(fp),
-                    "true_negatives": int(tn),
-                    "false_negatives": int(fn),
-                    "contamination": self.contamination,
-                    "trained_at": datetime.now().isoformat(),
-                    "status": "✅ Success"
-                }
-                
-                logger.info("✅ %s - F1: %.4f | Precision: %.4f | Recall: %.4f | ROC-AUC: %.4f",
-                           model_name, f1, precision, recall, roc_auc)
-                
-            except Exception as e:
-                logger.error("❌ %s - Error: %s", model_name, str(e))
-                self.results[model_name] = {
-                    "status": f"❌ Error: {str(e)}"
-                }
+            self.results[model_name] = result
+            if model is None:
+                logger.error("❌ %s - Error: %s", model_name, result["status"])
+                continue
+            
+            # Saved models get back the configured parallelism for inference
+            if "n_jobs" in model.get_params():
+                model.set_params(n_jobs=N_JOBS)
+            self.models[model_name] = model
+            logger.info("✅ %s - F1: %.4f | Precision: %.4f | Recall: %.4f | ROC-AUC: %.4f",
+                       model_name, result["f1_score"], result["precision"], result["recall"], result["roc_auc"])
     
     def save_models(self):
         """Save trained models and scaler."""
@@ -227,13 +272,13 @@ class MultiModelTrainer:
         
         # Save scaler
         scaler_path = os.path.join(MODEL_DIR, "scaler.pkl")
-        joblib.dump(self.scaler, scaler_path)
+        joblib.dump(self.scaler, scaler_path, compress=0, protocol=5)
         logger.info("✅ Saved scaler to: %s", scaler_path)
         
         # Save each model
         for model_name, model in self.models.items():
             model_path = os.path.join(MODEL_DIR, f"{model_name}_model.pkl")
-            joblib.dump(model, model_path)
+            joblib.dump(model, model_path, compress=0, protocol=5)
             logger.info("✅ Saved %s to: %s", model_name, model_path)
     
     def save_results(self):
@@ -329,10 +374,10 @@ def main():
         X = trainer.load_data()
         
         # Split data
-        X_train, X_val, X_test = trainer.split_data(X)
+        train_idx, val_idx, test_idx = trainer.split_data(X)
         
         # Train all models
-        trainer.train_models(X_train, X_val, X_test)
+        trainer.train_models(X, train_idx, val_idx, test_idx)
         
         # Save models
         trainer.save_models()
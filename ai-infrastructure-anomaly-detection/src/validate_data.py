@@ -16,6 +16,24 @@ import os
 import logging
 from datetime import datetime
 
+try:
+    import pyarrow  # noqa: F401 - enables pandas' multithreaded Arrow CSV reader
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Configuration
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 HISTORICAL_DATA_PATH = os.path.join(BASE_DIR, "data/processed/system_metrics_processed.csv")
@@ -25,6 +43,7 @@ VALIDATION_RULES = {
     "memory_usage": {"min": 0, "max": 100},
     "network_load": {"min": 0, "max": None}  # No upper limit
 }
+FEATURES = ["cpu_usage", "memory_usage", "network_load"]
 
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
@@ -35,6 +54,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def feature_matrix(df):
+    """Feature columns as one contiguous float64 array, shape (n_samples, 3)."""
+    return np.ascontiguousarray(df[FEATURES].to_numpy(dtype=np.float64))
+
 class DataValidator:
     def __init__(self):
         self.validation_results = {
@@ -42,6 +65,7 @@ class DataValidator:
             "passed": True,
             "checks": {}
         }
+        self._quartiles = None  # (feature matrix, [Q1, Q3]) shared by statistics and outliers
     
     def validate_schema(self, df):
         """Check required columns exist."""
@@ -59,31 +83,35 @@ class DataValidator:
         self.validation_results["checks"]["schema"] = "PASSED"
         return True
     
-    def validate_ranges(self, df):
+    def validate_ranges(self, df, A=None):
         """Check values are within expected ranges."""
         logger.info("RANGE VALIDATION")
         
+        if A is None:
+            A = feature_matrix(df)
+        
         all_valid = True
         range_violations = {}
         
-        for col, rules in VALIDATION_RULES.items():
-            min_val = rules["min"]
-            max_val = rules["max"]
-            
-            below_min = df[col] < min_val
-            if below_min.any():
-                count = below_min.sum()
-                logger.warning("%s: %s values below %s", col, count, min_val)
-                range_violations[f"{col}_below_min"] = int(count)
+        # One vectorized comparison per bound across all columns
+        mins = np.array([VALIDATION_RULES[col]["min"] for col in FEATURES], dtype=np.float64)
+        maxs = np.array([
+            np.inf if VALIDATION_RULES[col]["max"] is None else VALIDATION_RULES[col]["max"]
+            for col in FEATURES
+        ], dtype=np.float64)
+        below_counts = np.count_nonzero(A < mins, axis=0)
+        above_counts = np.count_nonzero(A > maxs, axis=0)
+        
+        for col, below, above in zip(FEATURES, below_counts, above_counts):
+            if below:
+                logger.warning("%s: %s values below %s", col, below, VALIDATION_RULES[col]["min"])
+                range_violations[f"{col}_below_min"] = int(below)
                 all_valid = False
             
-            if max_val is not None:
-                above_max = df[col] > max_val
-                if above_max.any():
-                    count = above_max.sum()
-                    logger.warning("%s: %s values above %s", col, count, max_val)
-                    range_violations[f"{col}_above_max"] = int(count)
-                    all_valid = False
+            if above:
+                logger.warning("%s: %s values above %s", col, above, VALIDATION_RULES[col]["max"])
+                range_violations[f"{col}_above_max"] = int(above)
+                all_valid = False
         
         if all_valid:
             logger.info("All values within expected ranges")
@@ -96,11 +124,14 @@ class DataValidator:
         
         return all_valid or len(range_violations) < len(df) * 0.05  # Fail if >5% violations
     
-    def validate_missing_values(self, df):
+    def validate_missing_values(self, df, A=None):
         """Check for null values."""
         logger.info("MISSING VALUE VALIDATION")
         
-        missing_counts = df.isnull().sum()
+        if A is None:
+            A = feature_matrix(df)
+        
+        missing_counts = pd.Series(np.isnan(A).sum(axis=0), index=FEATURES)
         total_missing = missing_counts.sum()
         
         if total_missing == 0:
@@ -122,7 +153,9 @@ class DataValidator:
         """Check for duplicate rows."""
         logger.info("DUPLICATE VALIDATION")
         
-        duplicates = df.duplicated().sum()
+        # Count only: one 64-bit hash per row, then distinct hashes (no per-row mask)
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        duplicates = len(row_hashes) - len(pd.unique(row_hashes))
         
         if duplicates == 0:
             logger.info("No duplicate rows detected")
@@ -146,19 +179,30 @@ class DataValidator:
                 }
                 return True
     
-    def validate_statistics(self, df):
+    def validate_statistics(self, df, A=None):
         """Validate statistical properties."""
         logger.info("STATISTICAL VALIDATION")
         
+        if A is None:
+            A = feature_matrix(df)
+        
+        # Column reductions over the whole matrix at once (NaN-skipping, as pandas)
+        means = np.nanmean(A, axis=0)
+        stds = np.nanstd(A, axis=0, ddof=1)
+        mins = np.nanmin(A, axis=0)
+        maxs = np.nanmax(A, axis=0)
+        quartiles = np.nanpercentile(A, [25, 75], axis=0)
+        self._quartiles = (A, quartiles)
+        
         stats = {}
-        for col in ["cpu_usage", "memory_usage", "network_load"]:
+        for i, col in enumerate(FEATURES):
             col_stats = {
-                "mean": float(df[col].mean()),
-                "std": float(df[col].std()),
-                "min": float(df[col].min()),
-                "max": float(df[col].max()),
-                "q25": float(df[col].quantile(0.25)),
-                "q75": float(df[col].quantile(0.75))
+                "mean": float(means[i]),
+                "std": float(stds[i]),
+                "min": float(mins[i]),
+                "max": float(maxs[i]),
+                "q25": float(quartiles[0, i]),
+                "q75": float(quartiles[1, i])
             }
             stats[col] = col_stats
             logger.info(
@@ -179,29 +223,34 @@ class DataValidator:
         
         return True
     
-    def validate_outliers(self, df):
+    def validate_outliers(self, df, A=None):
         """Detect statistical outliers using IQR method."""
         logger.info("OUTLIER DETECTION (IQR Method)")
         
-        outlier_summary = {}
-        total_outliers = 0
+        if A is None:
+            A = feature_matrix(df)
         
-        for col in ["cpu_usage", "memory_usage", "network_load"]:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outliers = ((df[col] < lower_bound) | (df[col] > upper_bound)).sum()
+        # Reuse the quartiles from validate_statistics when it ran on the same matrix
+        if self._quartiles is not None and self._quartiles[0] is A:
+            Q1, Q3 = self._quartiles[1]
+        else:
+            Q1, Q3 = np.nanpercentile(A, [25, 75], axis=0)
+        IQR = Q3 - Q1
+        
+        lower_bounds = Q1 - 1.5 * IQR
+        upper_bounds = Q3 + 1.5 * IQR
+        outlier_counts = np.count_nonzero((A < lower_bounds) | (A > upper_bounds), axis=0)
+        total_outliers = int(outlier_counts.sum())
+        
+        outlier_summary = {}
+        for i, col in enumerate(FEATURES):
+            outliers = int(outlier_counts[i])
             outlier_ratio = outliers / len(df)
-            total_outliers += outliers
             
             outlier_summary[col] = {
-                "count": int(outliers),
+                "count": outliers,
                 "ratio": float(outlier_ratio),
-                "bounds": [float(lower_bound), float(upper_bound)]
+                "bounds": [float(lower_bounds[i]), float(upper_bounds[i])]
             }
             
             if outliers > 0:
@@ -221,12 +270,18 @@ class DataValidator:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_path = os.path.join(RESULTS_DIR, f"validation_report_{timestamp}.json")
         
-        with open(report_path, 'w') as f:
-            json.dump(self.validation_results, f, indent=2)
+        # Serialize once and write the same bytes to both files
+        if ORJSON_AVAILABLE:
+            report_bytes = orjson.dumps(self.validation_results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            report_bytes = json.dumps(self.validation_results, indent=2).encode("utf-8")
+        
+        with open(report_path, 'wb') as f:
+            f.write(report_bytes)
         
         # Also save as latest
-        with open(os.path.join(RESULTS_DIR, "validation_report_latest.json"), 'w') as f:
-            json.dump(self.validation_results, f, indent=2)
+        with open(os.path.join(RESULTS_DIR, "validation_report_latest.json"), 'wb') as f:
+            f.write(report_bytes)
         
         logger.info("Validation report saved: %s", report_path)
         return self.validation_results["passed"]
@@ -244,6 +299,31 @@ def validate_live_data(cpu, mem, net):
     
     return len(issues) == 0, issues
 
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _validate_batch(arr):
+        """Per-row range check in one compiled pass."""
+        out = np.empty(arr.shape[0], np.bool_)
+        for i in range(arr.shape[0]):
+            out[i] = (0.0 <= arr[i, 0] <= 100.0) and (0.0 <= arr[i, 1] <= 100.0) and (arr[i, 2] >= 0.0)
+        return out
+else:
+    def _validate_batch(arr):
+        """Per-row range check as vectorized comparisons."""
+        cpu, mem, net = arr[:, 0], arr[:, 1], arr[:, 2]
+        return (cpu >= 0.0) & (cpu <= 100.0) & (mem >= 0.0) & (mem <= 100.0) & (net >= 0.0)
+
+def validate_live_batch(arr):
+    """Validate many live points at once.
+    
+    arr has shape (n_samples, 3) [cpu, memory, network]; returns a boolean mask,
+    True where the row passes the same checks as validate_live_data (NaN fails).
+    """
+    arr = np.ascontiguousarray(arr, dtype=np.float64)
+    if arr.ndim != 2 or arr.shape[1] != 3:
+        raise ValueError(f"Expected shape (N, 3), got {arr.shape}")
+    return _validate_batch(arr)
+
 def main():
     logger.info("DATA VALIDATION")
     
@@ -252,18 +332,19 @@ def main():
             logger.error("Data file not found: %s", HISTORICAL_DATA_PATH)
             return False
         
-        df = pd.read_csv(HISTORICAL_DATA_PATH)
+        df = pd.read_csv(HISTORICAL_DATA_PATH, engine=CSV_ENGINE)
         logger.info("Loaded %s samples from %s", len(df), HISTORICAL_DATA_PATH)
         
         validator = DataValidator()
         
-        # Run all validations
+        # Run all validations (numeric checks share one feature matrix)
         schema_ok = validator.validate_schema(df)
-        ranges_ok = validator.validate_ranges(df)
-        missing_ok = validator.validate_missing_values(df)
+        A = feature_matrix(df)
+        ranges_ok = validator.validate_ranges(df, A)
+        missing_ok = validator.validate_missing_values(df, A)
         duplicates_ok = validator.validate_duplicates(df)
-        validator.validate_statistics(df)
-        validator.validate_outliers(df)
+        validator.validate_statistics(df, A)
+        validator.validate_outliers(df, A)
         
         # Save report
         passed = validator.save_validation_report()
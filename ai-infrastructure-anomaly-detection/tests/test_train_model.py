@@ -16,4 +16,18 @@ def test_split_data_shapes():
     assert X_train.shape[1] == 3
     assert X_val.shape[1] == 3
     assert X_test.shape[1] == 3
-    assert len(X_train) + len(X_val) + len(X_test) == len(df)
\ No newline at end of file
+    assert len(X_train) + len(X_val) + len(X_test) == len(df)
+
+def test_split_data_reproducible():
+    df = pd.DataFrame(
+        {
+            "cpu_usage": list(range(100)),
+            "memory_usage": list(range(100, 200)),
+            "network_load": list(range(200, 300)),
+        }
+    )
+
+    first = split_data(df, random_state=7)
+    second = split_data(df, random_state=7)
+    for a, b in zip(first, second):
+        assert (a == b).all()
@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 
-from validate_data import DataValidator, validate_live_data
+from validate_data import DataValidator, validate_live_batch, validate_live_data
 
 
 def make_df(rows=10, cpu=50, mem=50, net=10):
@@ -44,4 +45,19 @@ def test_validate_live_data():
 
     ok, issues = validate_live_data(-1, 200, -5)
     assert ok is False
-    assert len(issues) == 3
\ No newline at end of file
+    assert len(issues) == 3
+
+
+def test_validate_live_batch_matches_scalar():
+    rows = np.array(
+        [
+            [10, 20, 5],
+            [-1, 20, 5],
+            [10, 200, 5],
+            [10, 20, -5],
+            [100, 0, 0],
+            [np.nan, 20, 5],
+        ]
+    )
+    mask = validate_live_batch(rows)
+    assert mask.tolist() == [validate_live_data(*row)[0] for row in rows]
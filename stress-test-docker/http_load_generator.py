@@ -6,18 +6,49 @@ to the Flask server to stress its CPU, memory, and network.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import threading
+import array
+import asyncio
 import time
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import random
 
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# int64 slots per counter stride: 8 x 8 bytes = one 64-byte cache line
+COUNTER_STRIDE = 8
+
+
+def raise_nofile_limit():
+    """Raise the soft open-file limit to the hard limit; returns the soft limit in effect."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError) as e:
+            logger.warning("Could not raise open-file limit: %s", e)
+    return soft
+
+
 class HTTPLoadGenerator:
     """Generate HTTP traffic to stress a web server."""
     
@@ -33,96 +64,208 @@ class HTTPLoadGenerator:
         self.requests_per_second = requests_per_second
         self.duration = duration
         self.num_threads = num_threads
-        self.stop_event = threading.Event()
-        self.request_count = 0
-        self.error_count = 0
-        self.lock = threading.Lock()
+        # Single writer (monitor/stop()), many readers: a plain bool read under
+        # the GIL is enough, no Event method call on every worker iteration
+        self._stop = False
+        # Each worker thread keeps its own keep-alive Session (no shared pool lock)
+        self._tls = threading.local()
+        # Per-worker counters in one flat int64 array, worker i at index
+        # i * COUNTER_STRIDE so no two workers' slots share a 64-byte cache line;
+        # a worker only ever writes its own slot, so no lock
+        self._request_counts = array.array('q', [0] * (COUNTER_STRIDE * num_threads))
+        self._error_counts = array.array('q', [0] * (COUNTER_STRIDE * num_threads))
+    
+    def stop(self):
+        """Ask all workers to exit after their current request."""
+        self._stop = True
+    
+    @property
+    def request_count(self):
+        """Requests completed so far, summed across workers."""
+        return sum(self._request_counts[::COUNTER_STRIDE])
     
-    def send_request(self):
+    @property
+    def error_count(self):
+        """Failed or non-200 requests so far, summed across workers."""
+        return sum(self._error_counts[::COUNTER_STRIDE])
+    
+    def _make_session(self):
+        """Session with a private one-host connection pool, for a single worker thread."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def send_request(self, worker_id):
         """Send a single HTTP request."""
+        prepared = getattr(self._tls, 'prepared', None)
+        if prepared is None:
+            # The URL never changes: parse it, build headers and pick the
+            # adapter once per worker, then resend the same PreparedRequest
+            session = self._tls.session = self._make_session()
+            prepared = self._tls.prepared = session.prepare_request(
+                requests.Request('HEAD', self.target_url)
+            )
+            self._tls.adapter = session.get_adapter(self.target_url)
+        
         try:
-            response = requests.get(self.target_url, timeout=5)
-            with self.lock:
-                self.request_count += 1
+            # HEAD: the server still runs the view, but there is no body to read;
+            # reading the empty content returns the connection to the pool
+            response = self._tls.adapter.send(prepared, timeout=5)
+            response.content
+            self._request_counts[worker_id * COUNTER_STRIDE] += 1
             
             if response.status_code != 200:
-                with self.lock:
-                    self.error_count += 1
+                self._error_counts[worker_id * COUNTER_STRIDE] += 1
                     
         except Exception as e:
-            with self.lock:
-                self.error_count += 1
+            self._error_counts[worker_id * COUNTER_STRIDE] += 1
     
     def worker(self, worker_id):
         """Worker thread that sends continuous requests."""
-        logger.info(f"Worker {worker_id} started")
+        # Only a sample of start lines, so large pools don't flood the log
+        if worker_id < 4 or worker_id % 10 == 0:
+            logger.info("Worker %d started", worker_id)
+        
+        # Fixed send schedule: slow requests are caught up by shorter sleeps
+        delay = self.num_threads / self.requests_per_second
+        next_send = time.monotonic()
         
-        while not self.stop_event.is_set():
-            self.send_request()
+        while not self._stop:
+            self.send_request(worker_id)
             
-            # Sleep to maintain target RPS per worker
-            delay = self.num_threads / self.requests_per_second
-            time.sleep(delay)
+            # Sleep until the next slot to maintain target RPS per worker
+            next_send += delay
+            sleep_for = next_send - time.monotonic()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
+        
+        # Release this worker's keep-alive connection
+        session = getattr(self._tls, 'session', None)
+        if session is not None:
+            session.close()
+    
+    async def worker_async(self, session, worker_id):
+        """Coroutine worker: continuous requests over the shared keep-alive connector."""
+        delay = self.num_threads / self.requests_per_second
+        next_send = time.monotonic()
+        
+        while not self._stop:
+            try:
+                # HEAD: no body to drain before the connection returns to the pool
+                async with session.head(self.target_url) as response:
+                    self._request_counts[worker_id * COUNTER_STRIDE] += 1
+                    
+                    if response.status != 200:
+                        self._error_counts[worker_id * COUNTER_STRIDE] += 1
+                        
+            except Exception as e:
+                self._error_counts[worker_id * COUNTER_STRIDE] += 1
+            
+            # Sleep until the next slot to maintain target RPS per worker
+            next_send += delay
+            sleep_for = next_send - time.monotonic()
+            if sleep_for > 0:
+                await asyncio.sleep(sleep_for)
+    
+    async def _run_async(self, start_time):
+        """Run all workers as coroutines on one event loop (aiohttp)."""
+        connector = aiohttp.TCPConnector(
+            limit=self.num_threads,
+            limit_per_host=self.num_threads,
+            keepalive_timeout=60
+        )
+        timeout = aiohttp.ClientTimeout(total=5)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async with asyncio.TaskGroup() as tg:
+                for i in range(self.num_threads):
+                    tg.create_task(self.worker_async(session, i))
+                
+                # Monitor progress
+                while time.monotonic() - start_time < self.duration:
+                    await asyncio.sleep(10)
+                    self._log_progress(start_time)
+                
+                # Stop workers (the task group waits for them to finish)
+                self.stop()
+                logger.info("\n🛑 Stopping attack...")
+    
+    def _run_threaded(self, start_time):
+        """Run all workers as blocking threads (requests)."""
+        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+            # Submit workers
+            futures = [executor.submit(self.worker, i) for i in range(self.num_threads)]
+            
+            # Monitor progress
+            while time.monotonic() - start_time < self.duration:
+                time.sleep(10)
+                self._log_progress(start_time)
+            
+            # Stop workers
+            self.stop()
+            logger.info("\n🛑 Stopping attack...")
+    
+    def _log_progress(self, start_time):
+        """Log requests, RPS and errors so far."""
+        elapsed = time.monotonic() - start_time
+        
+        request_count = self.request_count
+        current_rps = request_count / elapsed
+        logger.info(
+            "⚡ Progress: %.0fs | Requests: %d | RPS: %.1f | Errors: %d",
+            elapsed, request_count, current_rps, self.error_count
+        )
     
     def run(self):
         """Start the load test."""
         logger.info("=" * 60)
         logger.info("HTTP LOAD GENERATOR - DoS SIMULATION")
         logger.info("=" * 60)
-        logger.info(f"Target URL: {self.target_url}")
-        logger.info(f"Target RPS: {self.requests_per_second}")
-        logger.info(f"Threads: {self.num_threads}")
-        logger.info(f"Duration: {self.duration}s")
+        logger.info("Target URL: %s", self.target_url)
+        logger.info("Target RPS: %s", self.requests_per_second)
+        logger.info("Threads: %d (%s)", self.num_threads, 'asyncio/aiohttp' if AIOHTTP_AVAILABLE else 'threads/requests')
+        logger.info("Duration: %ss", self.duration)
+        if RESOURCE_AVAILABLE:
+            # One socket per worker plus the pool's spares; large pools can hit the default 1024 fds
+            logger.info("Open-file limit: %d", raise_nofile_limit())
         logger.info("=" * 60)
         
         # Test connection first
         try:
             logger.info("Testing connection to Flask server...")
             response = requests.get(self.target_url, timeout=5)
-            logger.info(f"✓ Connection successful! Status: {response.status_code}")
+            logger.info("✓ Connection successful! Status: %d", response.status_code)
         except Exception as e:
-            logger.error(f"✗ Cannot connect to Flask server: {e}")
+            logger.error("✗ Cannot connect to Flask server: %s", e)
             logger.error("Make sure Flask container is running and reachable!")
             return
         
-        start_time = time.time()
+        start_time = time.monotonic()
         
         # Start worker threads
-        logger.info(f"\n🔥 STARTING ATTACK in 3 seconds...")
+        logger.info("\n🔥 STARTING ATTACK in 3 seconds...")
         time.sleep(3)
         
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            # Submit workers
-            futures = [executor.submit(self.worker, i) for i in range(self.num_threads)]
-            
-            # Monitor progress
-            while time.time() - start_time < self.duration:
-                time.sleep(10)
-                elapsed = time.time() - start_time
-                
-                with self.lock:
-                    current_rps = self.request_count / elapsed
-                    logger.info(
-                        f"⚡ Progress: {elapsed:.0f}s | "
-                        f"Requests: {self.request_count} | "
-                        f"RPS: {current_rps:.1f} | "
-                        f"Errors: {self.error_count}"
-                    )
-            
-            # Stop workers
-            self.stop_event.set()
-            logger.info("\n🛑 Stopping attack...")
+        # One event loop with aiohttp when installed, else a thread per worker
+        if AIOHTTP_AVAILABLE:
+            asyncio.run(self._run_async(start_time))
+        else:
+            self._run_threaded(start_time)
         
         # Final report
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
+        request_count = self.request_count
+        error_count = self.error_count
         logger.info("=" * 60)
         logger.info("LOAD TEST COMPLETED")
         logger.info("=" * 60)
-        logger.info(f"Total Duration: {elapsed:.1f}s")
-        logger.info(f"Total Requests: {self.request_count}")
-        logger.info(f"Average RPS: {self.request_count / elapsed:.1f}")
-        logger.info(f"Success Rate: {(1 - self.error_count/max(self.request_count, 1))*100:.1f}%")
-        logger.info(f"Errors: {self.error_count}")
+        logger.info("Total Duration: %.1fs", elapsed)
+        logger.info("Total Requests: %d", request_count)
+        logger.info("Average RPS: %.1f", request_count / elapsed)
+        logger.info("Success Rate: %.1f%%", (1 - error_count/max(request_count, 1))*100)
+        logger.info("Errors: %d", error_count)
         logger.info("=" * 60)
 
 if __name__ == "__main__":
@@ -147,4 +290,4 @@ if __name__ == "__main__":
         generator.run()
     except KeyboardInterrupt:
         logger.info("\n⚠️  Load test interrupted by user")
-        generator.stop_event.set()
+        generator.stop()
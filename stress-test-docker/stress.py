@@ -1,14 +1,53 @@
+import mmap
+import multiprocessing
+import os
+import numpy as np
 import psutil
 import time
 import threading
 import logging
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Duty-cycle period for the CPU target: busy for cpu_percent of each period,
+# idle for the rest. Short enough that psutil's 1s samples see a steady load
+DUTY_CYCLE_PERIOD_SEC = 0.1
+
+# Iterations per compiled kernel call (~2ms of work, fine duty-cycle granularity)
+BURN_ITERATIONS = 2_500_000
+
+# Operand arrays for the NumPy kernel, built once so every iteration is
+# pure vectorized arithmetic (float64: the int64 cube sum would overflow)
+_CUBE_OPERAND = np.arange(100000, dtype=np.float64)
+_SQUARE_OPERAND = np.arange(50000, dtype=np.float64)
+
+if NUMBA_AVAILABLE:
+    @njit(nogil=True, cache=True)
+    def _burn():
+        """Sum BURN_ITERATIONS float cubes in a compiled loop, GIL released."""
+        s = 0.0
+        for i in range(BURN_ITERATIONS):
+            x = float(i)
+            s += x * x * x
+        return s
+else:
+    def _burn():
+        """Cube and square the operand arrays in NumPy's SIMD C loops."""
+        for _ in range(20):
+            _ = (_CUBE_OPERAND * _CUBE_OPERAND * _CUBE_OPERAND).sum()
+            _ = _SQUARE_OPERAND * _SQUARE_OPERAND
+            _ = np.dot(_SQUARE_OPERAND, _SQUARE_OPERAND)
+
 class StressTest:
     """Generate CPU, memory, and I/O stress on the system."""
     
@@ -23,41 +62,70 @@ class StressTest:
         self.memory_mb = memory_mb
         self.duration = duration
         self.start_time = None
-        self.stop_event = threading.Event()
-        self.memory_buffer = []
+        self.stop_event = multiprocessing.Event()
+        self.memory_buffer = None
     
-    def cpu_stress(self):
-        """Generate CPU stress via computation."""
-        logger.info(f"Starting CPU stress ({self.cpu_percent}% target)...")
-        self.start_time = time.time()
+    @staticmethod
+    def _cpu_stress_entry(worker_id, cpu_percent, duration, stop_event):
+        """CPU stress process: pin to one core, then burn until stopped."""
+        # Each worker gets its own core so the scheduler never migrates it
+        # and its working set stays in that core's L1/L2
+        if hasattr(os, "sched_setaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cores[worker_id % len(cores)]})
         
-        while not self.stop_event.is_set():
-            # Intensive computation without sleep - max CPU usage
-            # Multiple nested loops for aggressive stress
-            for _ in range(100):
-                _ = sum(i*i*i for i in range(100000))
-                _ = [x**2 for x in range(50000)]
-                _ = sum(x*x for x in range(50000))
-            
-            if self.duration and (time.time() - self.start_time) > self.duration:
-                break
+        logger.info("Starting CPU stress (%s%% target) on PID %d...", cpu_percent, os.getpid())
+        start_time = time.time()
+        
+        busy_sec = DUTY_CYCLE_PERIOD_SEC * min(max(cpu_percent, 0), 100) / 100.0
+        
+        try:
+            while not stop_event.is_set():
+                # Burn for the busy share of the period, sleep off the rest
+                period_start = time.monotonic()
+                while time.monotonic() - period_start < busy_sec:
+                    _burn()
+                
+                idle_sec = DUTY_CYCLE_PERIOD_SEC - (time.monotonic() - period_start)
+                if idle_sec > 0:
+                    time.sleep(idle_sec)
+                
+                if duration and (time.time() - start_time) > duration:
+                    break
+        except KeyboardInterrupt:
+            # Ctrl+C reaches the whole process group; the parent logs it
+            pass
+    
+    @staticmethod
+    def _allocate_memory(size):
+        """Map size bytes of anonymous memory and commit every page of it."""
+        buffer = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+        
+        # Ask for transparent huge pages: one 2MB TLB entry instead of
+        # 512 4KB ones when THP is in "madvise" mode
+        if hasattr(mmap, "MADV_HUGEPAGE"):
+            buffer.madvise(mmap.MADV_HUGEPAGE)
+        
+        # Write one byte per page so the kernel actually commits it;
+        # an untouched mapping stays overcommitted and adds no RSS
+        pages = len(range(0, size, mmap.PAGESIZE))
+        buffer[::mmap.PAGESIZE] = b"\x01" * pages
+        return buffer
     
     def memory_stress(self):
         """Generate memory stress via allocation."""
-        logger.info(f"Starting memory stress ({self.memory_mb}MB)...")
+        logger.info("Starting memory stress (%sMB)...", self.memory_mb)
+        
+        # mmap rejects zero-length mappings; nothing to hold
+        size = self.memory_mb * 1024 * 1024
+        if size <= 0:
+            logger.info("Memory stress disabled (0MB requested)")
+            return
         
         try:
-            # Allocate and hold memory
-            chunk_size = 1024 * 1024  # 1MB chunks
-            chunks = self.memory_mb
-            
-            for i in range(chunks):
-                self.memory_buffer.append(bytearray(chunk_size))
-                
-                if self.duration and (time.time() - self.start_time) > self.duration:
-                    break
-            
-            logger.info(f"Memory allocated: {len(self.memory_buffer)}MB")
+            # Allocate and hold memory in one anonymous mapping
+            self.memory_buffer = self._allocate_memory(size)
+            logger.info("Memory allocated: %dMB", size // (1024 * 1024))
             
             # Keep memory allocated
             while not self.stop_event.is_set():
@@ -66,43 +134,59 @@ class StressTest:
                 if self.duration and (time.time() - self.start_time) > self.duration:
                     break
         
-        except MemoryError:
+        except (MemoryError, OSError):
             logger.warning("Could not allocate all requested memory")
+        
+        finally:
+            if self.memory_buffer is not None:
+                self.memory_buffer.close()
+                self.memory_buffer = None
     
     def run(self, cpu_threads=4):
-        """Run stress test with multiple threads."""
-        logger.info(f"=== STRESS TEST STARTING ===")
-        logger.info(f"CPU threads: {cpu_threads}")
-        logger.info(f"Memory allocation: {self.memory_mb}MB")
-        logger.info(f"Duration: {self.duration}s (infinite if None)")
+        """Run stress test with one process per CPU worker."""
+        logger.info("=== STRESS TEST STARTING ===")
+        logger.info("CPU workers: %d", cpu_threads)
+        logger.info("Memory allocation: %sMB", self.memory_mb)
+        logger.info("Duration: %ss (infinite if None)", self.duration)
         logger.info("Press Ctrl+C to stop\n")
         
+        # Compile (or load the cached) kernel before any worker starts the clock
+        _burn()
+        self.start_time = time.time()
+        
         # Start memory stress in separate thread
         mem_thread = threading.Thread(target=self.memory_stress, daemon=True)
         mem_thread.start()
         
-        # Start CPU stress threads
-        cpu_threads_list = []
+        # Start CPU stress processes; each has its own GIL
+        cpu_workers = []
         for i in range(cpu_threads):
-            t = threading.Thread(target=self.cpu_stress, daemon=True)
-            t.start()
-            cpu_threads_list.append(t)
+            p = multiprocessing.Process(
+                target=StressTest._cpu_stress_entry,
+                args=(i, self.cpu_percent, self.duration, self.stop_event),
+                daemon=True,
+            )
+            p.start()
+            cpu_workers.append(p)
         
         try:
-            # Monitor and log system stats
+            # Monitor and log system stats; the priming call makes each later
+            # non-blocking cpu_percent() cover exactly one sleep interval
+            psutil.cpu_percent(interval=None)
             while True:
-                cpu_usage = psutil.cpu_percent(interval=1)
+                time.sleep(2)
+                
+                cpu_usage = psutil.cpu_percent(interval=None)
                 mem = psutil.virtual_memory()
                 
                 logger.info(
-                    f"CPU: {cpu_usage}% | Memory: {mem.percent}% ({mem.used // (1024**2)}MB / {mem.total // (1024**2)}MB)"
+                    "CPU: %s%% | Memory: %s%% (%dMB / %dMB)",
+                    cpu_usage, mem.percent, mem.used // (1024**2), mem.total // (1024**2)
                 )
                 
                 if self.duration and (time.time() - self.start_time) > self.duration:
                     logger.info("Duration reached, stopping...")
                     break
-                
-                time.sleep(2)
         
         except KeyboardInterrupt:
             logger.info("\nStress test stopped by user")
@@ -110,8 +194,8 @@ class StressTest:
         finally:
             self.stop_event.set()
             mem_thread.join(timeout=2)
-            for t in cpu_threads_list:
-                t.join(timeout=2)
+            for p in cpu_workers:
+                p.join(timeout=2)
             logger.info("=== STRESS TEST STOPPED ===")
 
 if __name__ == "__main__":
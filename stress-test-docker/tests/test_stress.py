@@ -0,0 +1,28 @@
+import mmap
+
+from stress import StressTest
+
+
+def test_allocate_memory_touches_every_page():
+    size = 4 * 1024 * 1024
+    buffer = StressTest._allocate_memory(size)
+    try:
+        assert len(buffer) == size
+        touched = buffer[::mmap.PAGESIZE]
+        assert touched == b"\x01" * len(range(0, size, mmap.PAGESIZE))
+    finally:
+        buffer.close()
+
+
+def test_memory_stress_releases_buffer_on_stop():
+    stress = StressTest(memory_mb=4)
+    stress.stop_event.set()
+    stress.memory_stress()
+    assert stress.memory_buffer is None
+
+
+def test_memory_stress_zero_mb_skips_allocation():
+    stress = StressTest(memory_mb=0)
+    stress.stop_event.set()
+    stress.memory_stress()
+    assert stress.memory_buffer is None